@@ -332,13 +332,17 @@ import sys
 import builtins
 from types import CodeType, ModuleType, MethodType
 from unittest.util import safe_repr
-from functools import wraps, partial
+from functools import wraps, partial, lru_cache
 
 
-_builtins = {name for name in dir(builtins) if not name.startswith('_')}
+_builtins = frozenset(name for name in dir(builtins) if not name.startswith('_'))
 
 FILTER_DIR = True
 
+# 设置为 False 时, mock 被调用只更新 called/call_count/call_args,
+# 不再记录 call_args_list/mock_calls/method_calls(用于调用次数非常多的性能测试, 节省内存和时间).
+_MOCK_TRACK_CALLS = True
+
 # Workaround for issue #12370
 # Without this, the __class__ properties wouldn't be set correctly
 _safe_super = super
@@ -745,9 +749,12 @@ def _setup_async_mock(mock):
 # '__dir__'[2:-2] 等于 'dir'
 # '__%s__' % dir 等于 '__dir__'
 # 两个相比较是相等的, 表示name参数就是一个前后两下划线的魔法方法.
+#
+# 这里直接比较前后两个字符, 不再格式化一个新的字符串; len(name) > 3 用于排除 '__' 和 '___'.
+# 注意: 不能改成查一个已知魔法方法名的 frozenset, 因为任何前后两下划线的名字(例如 '__foo__')都算魔法方法.
 #######################################################################################################################
 def _is_magic(name):
-    return '__%s__' % name[2:-2] == name
+    return name[:2] == '__' and name[-2:] == '__' and len(name) > 3
 
 
 #######################################################################################################################
@@ -837,6 +844,7 @@ sentinel = _Sentinel()
 DEFAULT = sentinel.DEFAULT
 _missing = sentinel.MISSING
 _deleted = sentinel.DELETED
+_not_started = sentinel.NOT_STARTED
 
 
 _allowed_names = {
@@ -845,6 +853,12 @@ _allowed_names = {
     '_mock_name', '_mock_new_name'
 }
 
+# 影响 _extract_mock_name 结果的属性.
+# 任何一个mock修改了这些属性, 都会递增 _mock_name_epoch, 使所有mock缓存的 __repr__ 失效;
+# 因为子mock的名字依赖于整条 parent 链上每一个mock的名字, 仅仅失效当前mock的缓存是不够的.
+_name_attributes = frozenset({'_mock_name', '_mock_new_name', '_mock_new_parent'})
+_mock_name_epoch = 0
+
 
 #######################################################################################################################
 # _delegating_property(name)
@@ -871,6 +885,22 @@ def _delegating_property(name):
     return property(_get, _set)
 
 
+#######################################################################################################################
+# _bind_call(sig, _call)
+# 该函数使用 sig 绑定 _call 中的参数, 返回 (name, BoundArguments); 参数与签名不吻合时返回异常对象(而不是抛出).
+#######################################################################################################################
+def _bind_call(sig, _call):
+    if len(_call) == 2:
+        name = ''
+        args, kwargs = _call
+    else:
+        name, args, kwargs = _call
+    try:
+        return name, sig.bind(*args, **kwargs)              # 这里通过try去测试_call与sig.bind的参数是否吻合.
+    except TypeError as e:
+        return e.with_traceback(None)                       # 这里返回一个Exception
+
+
 #######################################################################################################################
 # _CallList(list)
 # 该类继承了list内置数据类型, 所以_CallList本质上也是一个list.
@@ -898,31 +928,131 @@ class _CallList(list):
         if len_value > len_self:
             return False
 
+        # 空列表是任何列表的子序列.
+        if not len_value:
+            return True
+
         # 条件来到这里, 表示当前列表的长度 大于 value这个列表的长度.
         # (len_self - len_value) 的意思是: 从大的那个列表中截取出于小的那个列表一样大的列表.
         #  + 1 是因为 range 读取一个列表从 0 开始, 读取到这个列表末尾是 n - 1, 所以要+1才能等于 n.
         # 假设: len_value = 20 ; len_self = 30
         # range(0, 30 - 20 + 1)
         # range(0, 11)                      等于        [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        #
+        # 优化: 先用 value 的第一个元素筛选起点, 只有第一个元素相等时才切片比较剩余部分;
+        # 绝大多数起点在第一次比较时就被排除, 省去了每个起点都切片一个 len_value 长度的列表的开销.
+        # 比较的方向与 list 的 == 一致: self 中的元素在左边, 并且先判断 is.
+        first = value[0]
+        rest = value[1:]
         for i in range(0, len_self - len_value + 1):
-            # self[0:0+20]                  20个元素            len_self == 30 所以不会报错.
-            # self[1:1+20]                  20个元素
-            # self[2:2+20]                  20个元素
-            # self[10:10+20]                20个元素
-            sub_list = self[i:i+len_value]
+            item = self[i]
+            if item is not first and not item == first:
+                continue
 
             # 重点:
-            # sub_list是20个元素的列表, value也是20个元素的列表.
+            # 第一个元素相等, 再比较剩余的 len_value - 1 个元素;
             # 如果任何一次相等, 则表示大的列表中有一段连续的元素与 value 这个列表相等.
-            if sub_list == value:
+            if self[i+1:i+len_value] == rest:
                 return True
 
         return False
 
+    # 注意: 这里不缓存 pformat 的结果, 列表中的 call 可能持有可变参数(例如: mock(x); x.append(2)),
+    # 即便列表本身没有变化, repr 的结果也可能已经变了.
     def __repr__(self):
         return pprint.pformat(list(self))
 
 
+#######################################################################################################################
+# _FrozenCallList(_CallList)
+# 该类是一个只读的空 _CallList, 所有修改操作都会抛出 TypeError.
+#
+# _EMPTY_CALLLIST 是它的唯一实例, 当 mock 的调用记录列表尚未分配时(值为None),
+# 内部那些只读的代码路径(assert_* / _calls_repr)直接使用这个共享的空列表, 而不是每次都分配一个新的 _CallList().
+#######################################################################################################################
+class _FrozenCallList(_CallList):
+
+    def _read_only(self, /, *args, **kwargs):
+        raise TypeError('%s is read-only' % type(self).__name__)
+
+    append = extend = insert = pop = remove = clear = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    sort = reverse = _read_only
+
+
+_EMPTY_CALLLIST = _FrozenCallList()
+
+
+#######################################################################################################################
+# _delegating_call_list(name)
+# 该函数与 _delegating_property 的作用一样, 区别是: self._mock_ + name 这个列表是延迟分配的.
+# 初始化(或 reset_mock)之后它的值是 None, 直到第一次通过属性访问它时才会分配一个 _CallList 对象.
+# 通过属性拿到的列表始终是同一个对象, 所以调用方持有的引用在后续调用中仍然能看到新的记录.
+#
+# _peek_call_list(mock, name)
+# 该函数用于只读的场景: 尚未分配时返回 _EMPTY_CALLLIST, 不会触发分配.
+#
+# _lazy_call_list(name)
+# 与 _delegating_call_list 一样是延迟分配的, 但是不委托给 _mock_delegate(用于 method_calls).
+#######################################################################################################################
+def _delegating_call_list(name):
+    _allowed_names.add(name)
+    _the_name = '_mock_' + name
+    def _get(self, name=name, _the_name=_the_name):
+        sig = self._mock_delegate
+        if sig is not None:
+            return getattr(sig, name)
+        __dict__ = self.__dict__
+        value = __dict__[_the_name]
+        if value is None:
+            value = __dict__[_the_name] = _CallList()
+        return value
+    def _set(self, value, name=name, _the_name=_the_name):
+        sig = self._mock_delegate
+        if sig is None:
+            self.__dict__[_the_name] = value
+        else:
+            setattr(sig, name, value)
+
+    return property(_get, _set)
+
+
+def _lazy_call_list(name):
+    _allowed_names.add(name)
+    _the_name = '_mock_' + name
+    def _get(self, _the_name=_the_name):
+        __dict__ = self.__dict__
+        value = __dict__[_the_name]
+        if value is None:
+            value = __dict__[_the_name] = _CallList()
+        return value
+    def _set(self, value, _the_name=_the_name):
+        self.__dict__[_the_name] = value
+
+    return property(_get, _set)
+
+
+def _peek_call_list(mock, name):
+    sig = mock._mock_delegate
+    if sig is not None:
+        return getattr(sig, name)
+    value = mock.__dict__['_mock_' + name]
+    if value is None:
+        return _EMPTY_CALLLIST
+    return value
+
+
+#######################################################################################################################
+# _iter_parents(mock)
+# 该函数是一个generator, 从 mock 本身开始沿着 _mock_new_parent 链依次产出每一级 parent, 直到 None 为止.
+# _check_and_set_parent 和 _extract_mock_name 都需要遍历这条链, 这里统一成一个helper.
+#######################################################################################################################
+def _iter_parents(mock):
+    while mock is not None:
+        yield mock
+        mock = mock._mock_new_parent
+
+
 #######################################################################################################################
 # _check_and_set_parent(parent, value, name, new_name)
 # 该函数检查 value 参数是不是已经设定了 parent,
@@ -953,13 +1083,11 @@ def _check_and_set_parent(parent, value, name, new_name):
 
     # 这里是递归提取._mock_new_parent然后判断这个值是否和value相同,
     # 如果递归提取出来的parent与value相同, 则这表示添加过parent了, 不在做添加操作.
-    _parent = parent
-    while _parent is not None:
+    for _parent in _iter_parents(parent):
         # setting a mock (value) as a child or return value of itself
         # should not modify the mock
         if _parent is value:
             return False
-        _parent = _parent._mock_new_parent
 
     # 添加parent属性
     if new_name:
@@ -971,8 +1099,31 @@ def _check_and_set_parent(parent, value, name, new_name):
         value._mock_parent = parent
         value._mock_name = name
 
+    # value 或它的子mock拥有 spec 签名, 那么 parent 链也需要标记(参考 _mark_has_spec_signature).
+    if value._mock_has_spec_signature:
+        _mark_has_spec_signature(parent)
+
     return True
 
+
+#######################################################################################################################
+# _mark_has_spec_signature(mock)
+# 该函数将 mock 以及它所有的 parent(沿着 _mock_parent 和 _mock_new_parent 两条链) 标记为 _mock_has_spec_signature = True.
+#
+# _call_matcher 需要从 self._spec_signature 或子mock的 _spec_signature 中查找签名,
+# 绝大多数mock(以及它们的子mock)都没有签名, 这个标记让 _call_matcher 可以直接返回, 省去查找的开销.
+# 标记是保守的: 只会从 False 变成 True, 不会再变回 False.
+#######################################################################################################################
+def _mark_has_spec_signature(mock):
+    pending = [mock]
+    while pending:
+        mock = pending.pop()
+        if not _is_instance_mock(mock) or mock.__dict__.get('_mock_has_spec_signature'):
+            continue
+        mock.__dict__['_mock_has_spec_signature'] = True
+        pending.append(mock._mock_parent)
+        pending.append(mock._mock_new_parent)
+
 #######################################################################################################################
 # _MockIter
 # Internal class to identify if we wrapped an iterator object or not.
@@ -1026,16 +1177,14 @@ class NonCallableMock(Base):
         bases = (cls,)
         if not issubclass(cls, AsyncMock):
             # Check if spec is an async object or function
-            sig = inspect.signature(NonCallableMock.__init__)
-            bound_args = sig.bind_partial(cls, *args, **kw).arguments
-            spec_arg = [
-                arg for arg in bound_args.keys()
-                if arg.startswith('spec')
-            ]
-            if spec_arg:
-                # what if spec_set is different than spec?
-                if _is_async_obj(bound_args[spec_arg[0]]):
-                    bases = (AsyncMockMixin, cls,)
+            # 按照 NonCallableMock.__init__ 的参数位置直接解码 spec 和 spec_set:
+            # spec 是第一个位置参数(args[0]), spec_set 是第四个位置参数(args[3]).
+            # 这里替代了 inspect.signature(...).bind_partial(...) 的做法, 因为它仅仅是为了找出 spec 参数, 代价太高.
+            spec = kw.get('spec', args[0] if args else None)
+            if spec is None:
+                spec = kw.get('spec_set', args[3] if len(args) > 3 else None)
+            if spec is not None and _is_async_obj(spec):
+                bases = (AsyncMockMixin, cls,)
         new = type(cls.__name__, bases, {'__doc__': cls.__doc__})
         instance = _safe_super(NonCallableMock, cls).__new__(new)
         return instance
@@ -1059,8 +1208,8 @@ class NonCallableMock(Base):
     #                  "_mock_called":            False,
     #                  "_mock_call_args":         None,
     #                  "_mock_call_count":        0,
-    #                  "_mock_call_args_list":    _CallList(),
-    #                  "_mock_mock_calls":        _CallList(),
+    #                  "_mock_call_args_list":    None,                         延迟分配的 _CallList()
+    #                  "_mock_mock_calls":        None,                         延迟分配的 _CallList()
     #                  "method_calls":            _CallList(),
     #                  "_mock_unsafe":            unsafe}
     #
@@ -1082,12 +1231,25 @@ class NonCallableMock(Base):
         if _new_parent is None:
             _new_parent = parent
 
-        __dict__ = self.__dict__
-        __dict__['_mock_parent'] = parent
-        __dict__['_mock_name'] = name
-        __dict__['_mock_new_name'] = _new_name
-        __dict__['_mock_new_parent'] = _new_parent
-        __dict__['_mock_sealed'] = False
+        # 这里用一次 __dict__.update 代替逐个 __dict__['...'] = ... 的赋值,
+        # 减少字节码的执行次数, 同时让字典一次性扩容到位.
+        self.__dict__.update({
+            '_mock_parent': parent,
+            '_mock_name': name,
+            '_mock_new_name': _new_name,
+            '_mock_new_parent': _new_parent,
+            '_mock_sealed': False,
+            '_mock_children': {},
+            '_mock_wraps': wraps,
+            '_mock_delegate': None,
+            '_mock_called': False,
+            '_mock_call_args': None,
+            '_mock_call_count': 0,
+            '_mock_call_args_list': None,
+            '_mock_mock_calls': None,
+            '_mock_method_calls': None,
+            '_mock_unsafe': unsafe,
+        })
 
         # 如果 spec_set 制定了, 那就将它同意赋值给 spec, 然后将spec_set声明为True(bool值);
         # 表明 spec_set = True 是一个严谨对象.
@@ -1105,19 +1267,6 @@ class NonCallableMock(Base):
         # 尝试添加spec限定对象.
         self._mock_add_spec(spec, spec_set, _spec_as_instance, _eat_self)
 
-        __dict__['_mock_children'] = {}
-        __dict__['_mock_wraps'] = wraps
-        __dict__['_mock_delegate'] = None
-
-        __dict__['_mock_called'] = False
-        __dict__['_mock_call_args'] = None
-        __dict__['_mock_call_count'] = 0
-        __dict__['_mock_call_args_list'] = _CallList()
-        __dict__['_mock_mock_calls'] = _CallList()
-
-        __dict__['method_calls'] = _CallList()
-        __dict__['_mock_unsafe'] = unsafe
-
         # 通过kwargs去配置当前mock对象(self)的属性和值.
         # self.configure_mock这个方法的目的是为了简化代码和简化操作,
         # 仅通过配置即可完成对mock对象的属性和值的设定.
@@ -1171,15 +1320,19 @@ class NonCallableMock(Base):
         _spec_signature = None
         _spec_asyncs = []
 
-        # 暂不考虑async.
-        # 但是从这个代码来看: 作者期望spec是一个对象类对象? 从spec中尝试遍历所有的attribute(和method)
-        # 如果spec有method是coroutine类型的函数, 那么就将其标识纳入到 self.__dict__['_spec_asyncs'] 中.
-        for attr in dir(spec):
-            if asyncio.iscoroutinefunction(getattr(spec, attr, None)):
-                _spec_asyncs.append(attr)
-
         if spec is not None and not _is_list(spec):
 
+            # 暂不考虑async.
+            # 但是从这个代码来看: 作者期望spec是一个对象类对象? 从spec中尝试遍历所有的attribute(和method)
+            # 如果spec有method是coroutine类型的函数, 那么就将其标识纳入到 self.__dict__['_spec_asyncs'] 中.
+            # 注意: 当 spec 是 None 或 list/tuple(属性名列表)时, 它们的属性中不会有 coroutine 函数,
+            #      所以只有在这个分支中才需要扫描; dir(spec) 也只计算一次, 扫描完之后直接作为 _mock_methods 使用.
+            # (asyncio.iscoroutinefunction 先取到局部变量, 循环中不再重复查找全局变量和模块属性.)
+            spec_dir = dir(spec)
+            iscoroutinefunction = asyncio.iscoroutinefunction
+            _spec_asyncs = [attr for attr in spec_dir
+                            if iscoroutinefunction(getattr(spec, attr, None))]
+
             # 当spec是未实例化的类对象时, isinstance(spec, type) == True;  _spec_class 就是 spec 这个类对象.
             # 当spec是已实例化的对象时, isinstance(spec, type) == False; _spec_class 就是 type(spec);
             # type(已实例化的对象), 得到该对象的类对象. 举例:
@@ -1203,7 +1356,7 @@ class NonCallableMock(Base):
                                         _spec_as_instance, _eat_self)
             _spec_signature = res and res[1]      # 如果res存在, 那么它一定是一个元组对象, 提取第二个元素(Signature对象).
 
-            spec = dir(spec)                      # 提取spec的所有__dict__方法(字符串集合: [str, ...])
+            spec = spec_dir                       # 提取spec的所有__dict__方法(字符串集合: [str, ...])
 
         # 代码执行到这里, spec由可能是两种类型的值:
         # 1. list
@@ -1216,8 +1369,13 @@ class NonCallableMock(Base):
         __dict__['_spec_set'] = spec_set
         __dict__['_spec_signature'] = _spec_signature
         __dict__['_mock_methods'] = spec
+        # _mock_methods 的 frozenset 版本, 专门用于 __setattr__ / __getattr__ 中的 in 判断.
+        __dict__['_mock_methods_set'] = None if spec is None else frozenset(spec)
         __dict__['_spec_asyncs'] = _spec_asyncs
 
+        if _spec_signature is not None:
+            _mark_has_spec_signature(self)
+
     ###################################################################################################################
     # __get_return_value
     # __set_return_value
@@ -1281,8 +1439,9 @@ class NonCallableMock(Base):
     called = _delegating_property('called')
     call_count = _delegating_property('call_count')
     call_args = _delegating_property('call_args')
-    call_args_list = _delegating_property('call_args_list')
-    mock_calls = _delegating_property('mock_calls')
+    call_args_list = _delegating_call_list('call_args_list')
+    mock_calls = _delegating_call_list('mock_calls')
+    method_calls = _lazy_call_list('method_calls')
 
     ###################################################################################################################
     # __get_side_effect
@@ -1336,9 +1495,15 @@ class NonCallableMock(Base):
         self.called = False
         self.call_args = None
         self.call_count = 0
-        self.mock_calls = _CallList()
-        self.call_args_list = _CallList()
-        self.method_calls = _CallList()
+        if self._mock_delegate is None:
+            # 调用记录列表是延迟分配的, 这里恢复成未分配的状态即可.
+            __dict__ = self.__dict__
+            __dict__['_mock_mock_calls'] = None
+            __dict__['_mock_call_args_list'] = None
+        else:
+            self.mock_calls = _CallList()
+            self.call_args_list = _CallList()
+        self.__dict__['_mock_method_calls'] = None
 
         if return_value:
             self._mock_return_value = DEFAULT
@@ -1401,14 +1566,15 @@ class NonCallableMock(Base):
         # 如果因为缺少这两个属性而触发进入到这里, 会抛出AtrributeError异常.
         # TODO: 只要是正常实例化的mock对象在__init__里面都设定了这两个属性,
         #       那什么场景下会把这两个属性移除掉, 从而导致进入到__getattr__方法中来?
-        if name in {'_mock_methods', '_mock_unsafe'}:
+        if name in {'_mock_methods', '_mock_methods_set', '_mock_unsafe'}:
             raise AttributeError(name)
 
         # self._mock_methods 的值有两种类型: None 或 列表(dir(spec)).
         # name not in self._mock_methods 的意思是:
         # 如果name这个字符串参数即不再 mock 的属性范围内, 也不在限定对象spec的属性范围内, 那么就抛出异常.
-        elif self._mock_methods is not None:
-            if name not in self._mock_methods or name in _all_magics:
+        # 这里使用的是 frozenset 版本的 self._mock_methods_set.
+        elif self._mock_methods_set is not None:
+            if name not in self._mock_methods_set or name in _all_magics:
                 raise AttributeError("Mock object has no attribute %r" % name)
 
         # name参数是不是前后双下划线的魔法方法, 如果是的花并且不在属性范围内的那么就抛出异常.
@@ -1431,28 +1597,31 @@ class NonCallableMock(Base):
         # 当值为_SpecState类时, 创建一个带有限定属性的mock对象的, 写入self._mock_children字典中, 返回这个新创建的mock.
         #
         # 这里延申出来一个配对的属性, 那就是 parent 概念, 在创建新的mock时, 会将当前的mock当作parent来实例化.
-        result = self._mock_children.get(name)
+        # self._mock_children 会用到多次, 这里读取到局部变量中.
+        children = self._mock_children
+        result = children.get(name)
         if result is _deleted:
             raise AttributeError(name)
         elif result is None:
             wraps = None
-            if self._mock_wraps is not None:
+            mock_wraps = self._mock_wraps
+            if mock_wraps is not None:
                 # XXXX should we get the attribute without triggering code
                 # execution?
-                wraps = getattr(self._mock_wraps, name)
+                wraps = getattr(mock_wraps, name)
 
             result = self._get_child_mock(
                 parent=self, name=name, wraps=wraps, _new_name=name,
                 _new_parent=self
             )
-            self._mock_children[name] = result
+            children[name] = result
 
         elif isinstance(result, _SpecState):
             result = create_autospec(
                 result.spec, result.spec_set, result.instance,
                 result.parent, result.name
             )
-            self._mock_children[name]  = result
+            children[name] = result
 
         return result
 
@@ -1479,7 +1648,6 @@ class NonCallableMock(Base):
     ###################################################################################################################
     def _extract_mock_name(self):
         _name_list = [self._mock_new_name]                      # _name_list = ['goodmorning']
-        _parent = self._mock_new_parent                         # _parent == m == <Mock id='10000'>
         last = self                                             # last == <Mock name='mock.goodmorning' id='1002'>
 
         dot = '.'
@@ -1487,16 +1655,13 @@ class NonCallableMock(Base):
             dot = ''
 
         # 递归把所有parent都提取出来, 然后把这些parent的_mock_new_name都加入到 _name_list中.
-        while _parent is not None:
-            last = _parent                                      # last = <Mock id='10000'>
-
-            _name_list.append(_parent._mock_new_name + dot)     # _name_list = ['goodmorning', '.']
+        # 循环结束后 last 就是最顶层的那个 parent.
+        for last in _iter_parents(self._mock_new_parent):       # last = <Mock id='10000'>
+            _name_list.append(last._mock_new_name + dot)        # _name_list = ['goodmorning', '.']
             dot = '.'
-            if _parent._mock_new_name == '()':
+            if last._mock_new_name == '()':
                 dot = ''
 
-            _parent = _parent._mock_new_parent
-
         _name_list = list(reversed(_name_list))                 # _name_list = ['.', 'goodmorning']
         _first = last._mock_name or 'mock'                      # _first = 'mock'
         if len(_name_list) > 1:
@@ -1513,33 +1678,44 @@ class NonCallableMock(Base):
     #       <Mock name='mock.goodmorning' id='10001'>     # 子mock对象(实例化时提供了name参数)
     #       <Mock spec='Hello' id='10003'>                # 实例化Mock时提供了spec限定对象.
     #       <Mock spec_set='HelloStrict' id='10004'>      # 实例化Mock时提供了spec_set严格限定对象.
+    #
+    # id 之前的部分缓存在 self._mock_repr_cache 中, 缓存的 key 是 (_mock_name_epoch, _spec_class, bool(_spec_set)),
+    # 只要 key 不变就直接使用缓存, 省去 _extract_mock_name 遍历 parent 链的开销.
+    # 注意: id(self) 不放进缓存, 每次都重新格式化; 因为 copy.copy(mock) 会连同 __dict__ 中的缓存一起复制.
     ###################################################################################################################
+    _mock_repr_cache = None
+
     def __repr__(self):
+        spec_class = self._spec_class
+        spec_set = bool(self._spec_set)
+        cache = self._mock_repr_cache
+        if (cache is not None and cache[0] == _mock_name_epoch and
+                cache[1] is spec_class and cache[2] == spec_set):
+            return f"{cache[3]} id='{id(self)}'>"
+        epoch = _mock_name_epoch
+
         name = self._extract_mock_name()
 
         # 如果 name 不等于 'mock' 也不等于 'mock.' 那么 name_string 就是一个空字符串对象.
         name_string = ''
         if name not in ('mock', 'mock.'):
-            name_string = ' name=%r' % name
+            name_string = f' name={name!r}'
 
         # 如果 spec_string 是 None , 那么spec_string 就是一个空字符串对象.
         spec_string = ''
-        if self._spec_class is not None:
-            spec_string = ' spec=%r'
-            if self._spec_set:
-                spec_string = ' spec_set=%r'
-            spec_string = spec_string % self._spec_class.__name__
+        if spec_class is not None:
+            if spec_set:
+                spec_string = f' spec_set={spec_class.__name__!r}'
+            else:
+                spec_string = f' spec={spec_class.__name__!r}'
 
         # type(self).__name__ 是类的名称: Mock
         # name_string: 如果是空字符串, 那么就是留白.
         # spec_string: 如果是空字符串, 那么就是留白.
         # id(self): id串
-        return "<%s%s%s id='%s'>" % (
-            type(self).__name__,
-            name_string,
-            spec_string,
-            id(self)
-        )
+        prefix = f"<{type(self).__name__}{name_string}{spec_string}"
+        self.__dict__['_mock_repr_cache'] = (epoch, spec_class, spec_set, prefix)
+        return f"{prefix} id='{id(self)}'>"
 
     ###################################################################################################################
     # __dir__
@@ -1552,26 +1728,28 @@ class NonCallableMock(Base):
             return object.__dir__(self)
 
         # self._mock_methods 通常是 spec 或 spec_set 限定对象的属性和方法的集合.
-        # 如果实例化Mock对象时没有提供spec或spec_set参数, 那么extras就是一个空列表.
-        extras = self._mock_methods or []
-
-        # type(self) == <class unittest.mock.Mock>
+        # 如果实例化Mock对象时没有提供spec或spec_set参数, 那么它就是 None.
+        #
+        # 所有来源直接合并到同一个 set 中, 最后排序一次, 不再创建中间列表:
         # from_type == dir(unittest.mock.Mock) == 类对象的类变量和方法集合
-        # from_dict == 实例对象的属性和方法集合
+        # from_dict == 实例对象的属性和方法集合(排除掉下划线开头的, 但保留魔法方法)
         # from_child_mocks == self._mock_children + 排除掉 sentinels.DELETE 状态的mock对象的 name的集合
-        from_type = dir(type(self))
-        from_dict = list(self.__dict__)
-        from_child_mocks = [
-            m_name for m_name, m_value in self._mock_children.items()
-            if m_value is not _deleted]
+        names = set(self._mock_methods or ())
+
+        # dir(type(self)) 等于 type(self).__dict__ 加上每个基类的 dir(base).
+        # 每个mock实例都有自己独立的类, 它的 __dict__ 会被修改(例如: type(mock).foo = PropertyMock()), 所以每次都重新读取;
+        # 基类(Mock, MagicMock 以及用户的子类)同样可能在运行期间被修改(例如: patch.object), 所以也不做缓存.
+        _type = type(self)
+        names.update(e for e in _type.__dict__ if not e.startswith('_'))
+        for base in _type.__bases__:
+            names.update(e for e in dir(base) if not e.startswith('_'))
 
-        # 排除掉魔法方法
-        from_type = [e for e in from_type if not e.startswith('_')]
-        from_dict = [e for e in from_dict if not e.startswith('_') or
-                     _is_magic(e)]
+        names.update(e for e in self.__dict__ if not e.startswith('_') or _is_magic(e))
+        names.update(m_name for m_name, m_value in self._mock_children.items()
+                     if m_value is not _deleted)
 
-        # 合并和排序, 然后返回这个集合
-        return sorted(set(extras + from_type + from_dict + from_child_mocks))
+        # 排序, 然后返回这个集合
+        return sorted(names)
 
     ###################################################################################################################
     # __setattr__(self, name, value)
@@ -1586,16 +1764,23 @@ class NonCallableMock(Base):
         # }
         # 当 name 参数的值是这个范围内的属性时, 可以设定该属性值.
         if name in _allowed_names:
+            if name in _name_attributes:
+                global _mock_name_epoch
+                _mock_name_epoch += 1
             # property setters go through here
             return object.__setattr__(self, name, value)
 
+        # 将多次用到的属性读取到局部变量中, mock_methods 是 self._mock_methods 的 frozenset 版本.
+        __dict__ = self.__dict__
+        mock_methods = __dict__.get('_mock_methods_set')
+
         # 当 self._spec_set 有值时, self._mock_methods 的值通常是 dir(self._spec_set), 所以前两个条件通常都会是True.
         # name not in self._mock_methods 表示: 如果 name 不在限定范围内.
         # name not in self.__dict__ 表示: 如果 name 不在当前Mock对象的 self.__dict__ 范围内.
         # 这几个条件都不满足, 则报错.
-        elif (self._spec_set and self._mock_methods is not None and
-            name not in self._mock_methods and
-            name not in self.__dict__):
+        if (self._spec_set and mock_methods is not None and
+            name not in mock_methods and
+            name not in __dict__):
             raise AttributeError("Mock object has no attribute '%s'" % name)
 
         # _unsupported_magics = {
@@ -1614,15 +1799,26 @@ class NonCallableMock(Base):
         elif name in _all_magics:
             # self._mock_methods == dir(spec)
             # 所以魔法方法的赋值只限定再 dir(spec) 范围内, 否则报错.
-            if self._mock_methods is not None and name not in self._mock_methods:
+            if mock_methods is not None and name not in mock_methods:
                 raise AttributeError("Mock object has no attribute '%s'" % name)
 
             # 涉及到 magics 方法或属性的赋值, 主要是围绕value的值来决定如何赋值
             # 当 value 不是一个 mock 实例对象时, 将value的值写入到 Mock类中然后实例化这个Mock类.
             if not _is_instance_mock(value):
-                setattr(type(self), name, _get_method(name, value))
-                original = value
-                value = lambda *args, **kw: original(self, *args, **kw)
+                # type(self) 上安装的方法会转调实例 __dict__ 中的 value, 已经安装过就不再修改类.
+                _type = type(self)
+                method = _get_magic_method(name)
+                if _type.__dict__.get(name) is not method:
+                    setattr(_type, name, method)
+                # 实例上保存的是绑定了 self 的 value; partial 在 C 层面完成参数的拼接,
+                # 比 lambda *args, **kw: value(self, *args, **kw) 少一层 Python 函数调用.
+                # 注意: partial 不接受不可调用的对象(例如: mock.__hash__ = None), 这时仍然使用闭包,
+                #      赋值本身不报错, 等到魔法方法真正被调用时才报错.
+                if callable(value):
+                    value = partial(value, self)
+                else:
+                    original = value
+                    value = lambda *args, **kw: original(self, *args, **kw)
 
             # 当 value 是一个 mock 实例对象时, 将这个 value 视为一个 children 对象.
             else:
@@ -1631,6 +1827,8 @@ class NonCallableMock(Base):
                 _check_and_set_parent(self, value, None, name)
                 setattr(type(self), name, value)
                 self._mock_children[name] = value
+                if value._mock_has_spec_signature:
+                    _mark_has_spec_signature(self)
 
         # 当 name 参数的值为 '__class__' 时, 表示 value 时一个限定对象.
         elif name == '__class__':
@@ -1645,7 +1843,10 @@ class NonCallableMock(Base):
 
         # 当 self._mock_sealed 是 False 时, 表示当访问不存在的属性时创建子mock并返回该子mock对象.
         # 当 self._mock_sealed 是 True 时, 表示当访问不存在的属性时不创建子mock对象并抛出异常.
-        if self._mock_sealed and not hasattr(self, name):
+        # 已经在实例 __dict__ 中的属性(重新赋值)一定存在, 先用一次字典查找排除掉, 避免走 hasattr -> __getattr__ 的完整流程.
+        # 注意: sealed 的mock在 __getattr__ 中不会创建子mock, 所以 hasattr 没有副作用;
+        # 这个检查也必须留在魔法方法的分支之后, 因为魔法方法会先被写入 type(self), 然后 hasattr 才会成立.
+        if self._mock_sealed and name not in __dict__ and not hasattr(self, name):
             mock_name = f'{self._extract_mock_name()}.{name}'
             raise AttributeError(f'Cannot set {mock_name}')
 
@@ -1666,21 +1867,25 @@ class NonCallableMock(Base):
     def __delattr__(self, name):
         # 尝试从 type(self) 的类中删除该属性.
         # 当 name 属于 _all_magics 范围, 且 name 属于 type(self).__dict__ 范围
+        __dict__ = self.__dict__
         if name in _all_magics and name in type(self).__dict__:
             # 删除 type(self) 类对象的属性.
             delattr(type(self), name)
 
             # 当 name 不在 self.__dict (实例)范围, 则不做后续删除动作.
-            if name not in self.__dict__:
+            if name not in __dict__:
                 # for magic methods that are still MagicProxy objects and
                 # not set on the instance itself
                 return
 
         # 尝试从当前mock实例的_mock_children中提取name这个mock子对象.
-        obj = self._mock_children.get(name, _missing)
+        children = self._mock_children
+        obj = children.get(name, _missing)
 
         # 如果 name 在 self.__dict__ 范围, 那么就删除该属性.
-        if name in self.__dict__:
+        # 这里保留 super() 而不是直接调用 object.__delattr__:
+        # 用户的子类可能混入了其他定义 __delattr__ 的类, 它们在 MRO 中位于 NonCallableMock 之后.
+        if name in __dict__:
             _safe_super(NonCallableMock, self).__delattr__(name)
 
         # 如果 obj 这个子mock是sentinels.DELETE状态, 那么就报错.
@@ -1688,11 +1893,12 @@ class NonCallableMock(Base):
             raise AttributeError(name)
 
         # 如果 obj 这个子mock不是sentinels.MISSING时, 从self._mock_children中删除这个子mock对象.
+        # (先删除再赋值, 让 name 排到 _mock_children 的末尾, 与之前的顺序保持一致.)
         if obj is not _missing:
-            del self._mock_children[name]
+            del children[name]
 
         # 删除后, 标记当前name的值是一个 sentinels.DELETE 状态.
-        self._mock_children[name] = _deleted
+        children[name] = _deleted
 
     ###################################################################################################################
     # _format_mock_call_signature(self, args, kwargs)
@@ -1758,7 +1964,8 @@ class NonCallableMock(Base):
 
         for name in names:
             child = children.get(name)                      # 通过 name 在 self._mock_children 中找到对应的子mock对象
-            if child is None or isinstance(child, _SpecState):
+            # 已经被删除(del mock.name)的子mock在 _mock_children 中是 _deleted, 它没有 _mock_children 属性.
+            if child is None or child is _deleted or isinstance(child, _SpecState):
                 break
             else:
                 children = child._mock_children
@@ -1770,7 +1977,11 @@ class NonCallableMock(Base):
     # _call_matcher(self, _call)
     # 该函数用于匹配限定对象(self._spec_signature)的参数签名 或 匹配嵌套的限定对象(也是_spec_signature)的参数签名.
     # 如果没有匹配到参数签名, 那么就原封不动的返回 _call 参数.
+    #
+    # _mock_has_spec_signature 由 _mark_has_spec_signature 维护, 默认 False.
     ###################################################################################################################
+    _mock_has_spec_signature = False
+
     def _call_matcher(self, _call):
         """
         Given a call (or simply an (args, kwargs) tuple), return a
@@ -1778,7 +1989,21 @@ class NonCallableMock(Base):
         This is a best effort method which relies on the spec's signature,
         if available, or falls back on the arguments themselves.
         """
+        # 当前mock和它的子mock都没有 spec 签名时, 直接原封不动的返回 _call.
+        if not self._mock_has_spec_signature:
+            return _call
+
+        sig = self._call_signature(_call)
+        if sig is not None:
+            return _bind_call(sig, _call)
+        else:
+            return _call
 
+    ###################################################################################################################
+    # _call_signature(self, _call)
+    # 该函数返回用于匹配 _call 的参数签名, 没有签名时返回 None.
+    ###################################################################################################################
+    def _call_signature(self, _call):
         # 当 _call 是一个 tuple 时, 它有三种形式:
         # _Call(('name', (), {})) == ('name',)               使用_Call来做==操作比较时, 可以省略掉那些空的冗余.
         # _Call(('name', (1,), {})) == ('name', (1,))        使用_Call来做==操作比较时, 可以省略掉那些空的冗余.
@@ -1786,24 +2011,41 @@ class NonCallableMock(Base):
         #
         # 当 _call 大于两个对象时, 表示它肯定提供了 name, 所以下面这里使用_call[0]来取name.
         # 除非有涉及到嵌套的对象, 否则基本上sig就是个None.
-        if isinstance(_call, tuple) and len(_call) > 2:
-            sig = self._get_call_signature_from_name(_call[0])
-        else:
-            sig = self._spec_signature
+        # name 为空(例如 call(1, 2))时 _get_call_signature_from_name 也是返回 self._spec_signature, 这里直接读取.
+        _len = len(_call) if isinstance(_call, tuple) else 0
+        if _len > 2 and _call[0]:
+            return self._get_call_signature_from_name(_call[0])
+        return self._spec_signature
 
-        if sig is not None:
-            if len(_call) == 2:
-                name = ''
-                args, kwargs = _call
-            else:
-                name, args, kwargs = _call
-            try:
-                return name, sig.bind(*args, **kwargs)          # 这里通过try去测试_call与sig.bind的参数是否吻合.
-            except TypeError as e:
-                return e.with_traceback(None)                   # 这里返回一个Exception
-        else:
+    ###################################################################################################################
+    # _recorded_call_matcher(self, _call)
+    # 与 _call_matcher 相同, 但只用于当前mock自己记录的 _Call 对象
+    # (call_args / call_args_list / mock_calls / await_args / await_args_list 中的元素).
+    # 同一个历史记录在每次断言时都会被重新匹配, 所以把 sig.bind 的结果缓存在这个 _Call 对象上(随 _Call 对象一起释放);
+    # 缓存只在 sig 是同一个对象时有效, 绑定失败的异常不缓存.
+    # 注意: 调用方传进来的 call(...) 不能走这里, 比较参数的方法不应该修改它的参数(例如模块级的 call 对象).
+    ###################################################################################################################
+    def _recorded_call_matcher(self, _call):
+        if not self._mock_has_spec_signature:
             return _call
 
+        sig = self._call_signature(_call)
+        if sig is None:
+            return _call
+
+        call_dict = getattr(_call, '__dict__', None)
+        if call_dict is None:
+            return _bind_call(sig, _call)
+
+        cached = call_dict.get('_mock_bound')
+        if cached is not None and cached[0] is sig:
+            return cached[1]
+
+        result = _bind_call(sig, _call)
+        if not isinstance(result, Exception):
+            call_dict['_mock_bound'] = (sig, result)
+        return result
+
     ###################################################################################################################
     # assert_not_called(self)
     # 该方法用于断言当前mock对象没有被调用过.
@@ -1880,7 +2122,7 @@ class NonCallableMock(Base):
         # NonCallableMock._call_matcher 在常规情况下会原封不动的返回(args, kwargs).
         # 这里就是判断当前的 (args, kwargs) 和 最后一次执行mock的参数是否一致.
         expected = self._call_matcher((args, kwargs))
-        actual = self._call_matcher(self.call_args)
+        actual = self._recorded_call_matcher(self.call_args)
         if expected != actual:
             cause = expected if isinstance(expected, Exception) else None
             raise AssertionError(_error_message()) from cause
@@ -1918,8 +2160,10 @@ class NonCallableMock(Base):
         If `any_order` is True then the calls can be in any order, but
         they must all appear in `mock_calls`."""
 
+        matcher = self._call_matcher
+
         # expected: list; 尝试提取嵌套的对象的执行参数, 如果没有嵌套对象, 那就圆路返回该参数.
-        expected = [self._call_matcher(c) for c in calls]
+        expected = list(map(matcher, calls))
 
         # (e for e in expected if isinstance(e, Exception): 遍历expected列表是否存在异常信息(那些签名与调用的签名不吻合).
         # next(iterator, None): 提取第一个错误的信息.
@@ -1927,7 +2171,7 @@ class NonCallableMock(Base):
         cause = next((e for e in expected if isinstance(e, Exception)), None)
 
         # self.mock_calls 是一个列表, 用于存储历史调用记录.
-        all_calls = _CallList(self._call_matcher(c) for c in self.mock_calls)
+        all_calls = _CallList(map(self._recorded_call_matcher, _peek_call_list(self, 'mock_calls')))
 
         # any_order == False, 表示: 要求连续性的匹配.
         if not any_order:
@@ -1962,17 +2206,21 @@ class NonCallableMock(Base):
             return
 
         # any_order == True, 表示: 不要求连续性的匹配.
-        # list(all_calls): 将 _CallList 对象转换成常规的list对象.
-        all_calls = list(all_calls)
-
+        # all_calls 是这个函数内部新建的列表, 直接在它上面移除元素即可, 不需要再复制一份.
+        #
+        # 注意: 这里不能改用 collections.Counter 做多重集合的差集,
+        # 因为 _Call 是不可哈希的(定义了 __eq__ 的 tuple 子类), 而且它的相等判断(ANY, 没有名字的 call 等)
+        # 与哈希值也不一致; 所以只能保持 list.remove 的逐个比较.
+        #
         # 遍历expected, 用每个kall元素去尝试从 all_calls 移除 kall 对象,
         # 如果单个移除成功, 那么就表示单个元素匹配成功.
         # 如果全部移除成功, 那么就表示非连续性的匹配成功.
         # 如果任意一个元素移除失败, 那么就表示匹配失败.
+        remove = all_calls.remove
         not_found = []
         for kall in expected:
             try:
-                all_calls.remove(kall)
+                remove(kall)
             except ValueError:
                 not_found.append(kall)
 
@@ -1982,7 +2230,7 @@ class NonCallableMock(Base):
             raise AssertionError(
                 '%r does not contain all of %r in its call list, '
                 'found %r instead' % (self._mock_name or 'mock',
-                                      tuple(not_found), all_calls)
+                                      tuple(not_found), list(all_calls))
             ) from cause
 
     ###################################################################################################################
@@ -1997,8 +2245,10 @@ class NonCallableMock(Base):
         `assert_called_with` and `assert_called_once_with` that only pass if
         the call is the most recent one."""
 
+        matcher = self._call_matcher
+
         # expected 是单个对象, 而且只提供两个参数.
-        expected = self._call_matcher((args, kwargs))
+        expected = matcher((args, kwargs))
 
         # 这里为什么使用 self._call_args_list 而不是使用 self.mock_calls ?
         # 主要的原因是: 这里不关注嵌套限定对象, 而只关注限定对象,
@@ -2007,7 +2257,7 @@ class NonCallableMock(Base):
         # 而self.mock_calls的_Call是三个参数(含name),
         # 而 self.call_args_list 的_Call是两个参数,
         # 所以这里采用 self.call_args_list 来当作比较对象.
-        actual = [self._call_matcher(c) for c in self.call_args_list]
+        actual = list(map(self._recorded_call_matcher, _peek_call_list(self, 'call_args_list')))
 
         # 如果 expected 对象不在 actual(历史调用记录) 中, 那么就抛出异常.
         if expected not in actual:
@@ -2042,31 +2292,31 @@ class NonCallableMock(Base):
 
         # 当前实例的类对象, 举例: <class unittest.mock.Mock>
         # 重点: 下面这段代码定义了 AsyncMock , MagicMock, Mock 的关系树.
+        # issubclass 的判断结果由 _child_mock_kind 按 __bases__ 缓存.
         _type = type(self)
+        is_magic, is_async, noncallable_klass = _child_mock_kind(_type.__bases__)
 
         # 如果当前类对象继承了MagicMock 并且 _new_name 属于 _async_method_magics 范围, 那么 klass 就是一个 AsyncMock 类对象.
-        if issubclass(_type, MagicMock) and _new_name in _async_method_magics:
+        if is_magic and _new_name in _async_method_magics:
             # Any asynchronous magic becomes an AsyncMock
             klass = AsyncMock
 
         # 当前类对象继承了AsyncMockMixin.
-        elif issubclass(_type, AsyncMockMixin):
+        elif is_async:
             # Any synchronous method on AsyncMock becomes a MagicMock
             # 继承了AsyncMockMixin的类的对象如果含有任意同步的方法, 那么这个类就属于MagicMock类.
             # 重点: 这就是 MagicMock 的定义.
             if (_new_name in _all_sync_magics or
-                    self._mock_methods and _new_name in self._mock_methods):
+                    self._mock_methods_set and _new_name in self._mock_methods_set):
                 # Any synchronous method on AsyncMock becomes a MagicMock
                 klass = MagicMock
             # 继承了AsyncMockMixin的类的对象不包含任何同步的方法, 那么这个类就属于AsyncMock类.
             else:
                 klass = AsyncMock
 
-        elif not issubclass(_type, CallableMixin):
-            if issubclass(_type, NonCallableMagicMock):
-                klass = MagicMock
-            elif issubclass(_type, NonCallableMock):
-                klass = Mock
+        # 当前类对象没有继承CallableMixin(不可调用): NonCallableMagicMock -> MagicMock; NonCallableMock -> Mock.
+        elif noncallable_klass is not None:
+            klass = noncallable_klass
 
         else:
             klass = _type.__mro__[1]
@@ -2094,10 +2344,36 @@ class NonCallableMock(Base):
         If self.mock_calls is empty, an empty string is returned. The
         output will be truncated if very long.
         """
-        if not self.mock_calls:
+        mock_calls = _peek_call_list(self, 'mock_calls')
+        if not mock_calls:
             return ""
-        return f"\n{prefix}: {safe_repr(self.mock_calls)}."
+        return f"\n{prefix}: {safe_repr(mock_calls)}."
+
+
 
+#######################################################################################################################
+# _child_mock_kind(bases)
+# 该函数为 _get_child_mock 预先计算 issubclass 的判断结果, 返回: (is_magic, is_async, noncallable_klass)
+# is_magic:          是否继承了 MagicMock.
+# is_async:          是否继承了 AsyncMockMixin.
+# noncallable_klass: 不可调用的mock的子mock类型(MagicMock 或 Mock); 可调用的mock返回 None.
+#
+# 参数是 type(mock).__bases__ 而不是 type(mock):
+# NonCallableMock.__new__ 为每个实例都创建了一个新的子类, 用 type(mock) 做缓存的 key 会让缓存无限增长;
+# 而 __bases__ 是 (cls,) 或 (AsyncMockMixin, cls) 这样的固定组合, 数量很少.
+#######################################################################################################################
+@lru_cache(maxsize=None)
+def _child_mock_kind(bases):
+    def inherits(klass):
+        return any(issubclass(base, klass) for base in bases)
+
+    if inherits(CallableMixin):
+        noncallable_klass = None
+    elif inherits(NonCallableMagicMock):
+        noncallable_klass = MagicMock
+    else:
+        noncallable_klass = Mock
+    return inherits(MagicMock), inherits(AsyncMockMixin), noncallable_klass
 
 
 def _try_iter(obj):
@@ -2159,17 +2435,31 @@ class CallableMixin(Base):
     #
     # #################################################################################################################
     def _increment_mock_call(self, /, *args, **kwargs):
-        self.called = True
-        # 记录mock调用的次数
-        self.call_count += 1
-
         # 将args和kwargs包裹成一个_call对象
         # 然后将_call对象保存到 call_args_list 集合中保存起来.
         # handle call_args
         # needs to be set here so assertions on call arguments pass before
         # execution in the case of awaited calls
-        _call = _Call((args, kwargs), two=True)
-        self.call_args = _call
+        _call = _Call._fast_two(args, kwargs)
+
+        # called, call_count, call_args 都是 _delegating_property;
+        # 没有委托对象时直接写入 __dict__, 省去 __setattr__ 和 property 的 getter/setter 这几层 Python 函数调用.
+        __dict__ = self.__dict__
+        if __dict__['_mock_delegate'] is None:
+            __dict__['_mock_called'] = True
+            # 记录mock调用的次数
+            __dict__['_mock_call_count'] += 1
+            __dict__['_mock_call_args'] = _call
+        else:
+            self.called = True
+            self.call_count += 1
+            self.call_args = _call
+
+        # 关闭了调用记录(_MOCK_TRACK_CALLS = False)时, 只更新 called/call_count/call_args,
+        # 不再向 call_args_list, mock_calls 以及 parent 链上的 method_calls/mock_calls 追加记录.
+        if not _MOCK_TRACK_CALLS:
+            return
+
         self.call_args_list.append(_call)
 
         # 这两行代码不应该放在这里, 应该放在_new_parent = self._mock_new_parent 一起.
@@ -2182,8 +2472,11 @@ class CallableMixin(Base):
         mock_call_name = self._mock_new_name
         is_a_call = mock_call_name == '()'
 
+        # parent 链上的每一级都要创建 _Call 对象, 这里先读取到局部变量中.
+        make_call = _Call._fast_three
+
         # 将所有mock调用的参数都收集到self.mock_calls集合中.
-        self.mock_calls.append(_Call(('', args, kwargs)))
+        self.mock_calls.append(make_call('', args, kwargs))
 
         # TODO: 由于尚未深入到 mock 链, 所以暂时不分析这里.
         # follow up the chain of mocks:
@@ -2191,23 +2484,30 @@ class CallableMixin(Base):
         while _new_parent is not None:
 
             # handle method_calls:
+            # method_calls 和 mock_calls 的名字相同时(访问属性得到的子mock通常如此), 两个列表共享同一个 _Call 对象.
+            this_mock_call = None
             if do_method_calls:
-                _new_parent.method_calls.append(_Call((method_call_name, args, kwargs)))
+                this_method_call = make_call(method_call_name, args, kwargs)
+                _new_parent.method_calls.append(this_method_call)
+                if method_call_name == mock_call_name:
+                    this_mock_call = this_method_call
                 do_method_calls = _new_parent._mock_parent is not None
                 if do_method_calls:
                     method_call_name = _new_parent._mock_name + '.' + method_call_name
 
             # handle mock_calls:
-            this_mock_call = _Call((mock_call_name, args, kwargs))
+            if this_mock_call is None:
+                this_mock_call = make_call(mock_call_name, args, kwargs)
             _new_parent.mock_calls.append(this_mock_call)
 
-            if _new_parent._mock_new_name:
+            new_name = _new_parent._mock_new_name
+            if new_name:
                 if is_a_call:
                     dot = ''
                 else:
                     dot = '.'
-                is_a_call = _new_parent._mock_new_name == '()'
-                mock_call_name = _new_parent._mock_new_name + dot + mock_call_name
+                is_a_call = new_name == '()'
+                mock_call_name = new_name + dot + mock_call_name
 
             # follow the parental chain:
             _new_parent = _new_parent._mock_new_parent
@@ -2261,8 +2561,9 @@ class CallableMixin(Base):
 
         # 3. 如果上面两个都没有提供, 则mock会检查实例化时是否提供了 wraps 参数值,
         #    提供了就去执行这个wraps函数, 具体的返回值由这个wraps函数来控制.
-        if self._mock_wraps is not None:
-            return self._mock_wraps(*args, **kwargs)
+        wraps = self._mock_wraps
+        if wraps is not None:
+            return wraps(*args, **kwargs)
 
         # 4. 如果上面的所有参数都没有提供, 那么就返回一个 return_value (默认时None).
         return self.return_value
@@ -2329,17 +2630,40 @@ class Mock(CallableMixin, NonCallableMock):
 # 从thing参数中提取comp属性.
 #######################################################################################################################
 def _dot_lookup(thing, comp, import_path):
-    try:
-        # 尝试从thing参数(当前级模块)中提取comp属性
-        return getattr(thing, comp)
-    except AttributeError:
-        # 如果提取失败那么尝试加载下一级模块并从下一级模块中提取comp属性并返回
-        #
-        # 踩坑:
-        # 这里重新按照 import_path 再去加载下一级模块, 但是并没有赋值给thing.
-        # 但是经过测试加载下一级模块会持续更新到thing变量中.
-        __import__(import_path)
-        return getattr(thing, comp)
+    # 尝试从thing参数(当前级模块)中提取comp属性
+    # 使用 getattr 的默认值而不是 try/except AttributeError, 对于模块这类对象, 属性不存在时不需要构造异常对象.
+    value = getattr(thing, comp, _missing)
+    if value is not _missing:
+        return value
+
+    # 如果提取失败那么尝试加载下一级模块并从下一级模块中提取comp属性并返回
+    #
+    # 踩坑:
+    # 这里重新按照 import_path 再去加载下一级模块, 但是并没有赋值给thing.
+    # 但是经过测试加载下一级模块会持续更新到thing变量中.
+    __import__(import_path)
+    return getattr(thing, comp)
+
+
+#######################################################################################################################
+# _import_paths(target)
+# 该函数把 target 拆分成 (第一级模块名, ((comp, import_path), ...)), 结果按 target 字符串缓存.
+# 例如: 'unittest.test.testmock' -> ('unittest', (('test', 'unittest.test'), ('testmock', 'unittest.test.testmock')))
+#
+# 注意: 这里只缓存字符串的拆分结果, 不缓存导入得到的对象;
+# 因为 target 指向的对象可能被其他 patch 替换(例如同时 patch('os.path') 和 patch('os.path.exists')),
+# 或者 sys.modules 中的模块被替换, 所以每次都要重新按属性查找.
+#######################################################################################################################
+@lru_cache(maxsize=None)
+def _import_paths(target):
+    components = target.split('.')
+    import_path = components.pop(0)
+    first = import_path
+    paths = []
+    for comp in components:
+        import_path += ".%s" % comp
+        paths.append((comp, import_path))
+    return first, tuple(paths)
 
 
 #######################################################################################################################
@@ -2347,8 +2671,7 @@ def _dot_lookup(thing, comp, import_path):
 # 该函数用于将字符串导入成module对象.
 #######################################################################################################################
 def _importer(target):
-    components = target.split('.')
-    import_path = components.pop(0)
+    import_path, paths = _import_paths(target)
 
     # 踩坑:
     # __import__ 有个特点: 如果当前文件有使用了 import 语句导入了与 import_path
@@ -2406,7 +2729,7 @@ def _importer(target):
     # target = 'unittest.test.testmock.testpatch'
     # import_path = 'unittest'
     # components: ['test', 'testmock', 'testpatch']
-    for comp in components:
+    for comp, import_path in paths:
         # 第一次遍历
         # comp = 'test'
         # import_path = 'unittest.test'
@@ -2429,26 +2752,44 @@ def _importer(target):
         #                    'unittest.test.testmock.testpatch')
         # thing: <module 'unittest.test.testmock.testpatch' from
         #        'C:\\Python38\\lib\\unittest\\test\\testmock\\testpatch.py'>
-        import_path += ".%s" % comp
         thing = _dot_lookup(thing, comp, import_path)
     return thing
 
 
 #######################################################################################################################
 # _is_started(patcher)
-# 该函数用于检查和判断 patcher 对象是否拥有 is_local 属性,
-# 如果已经拥有 is_local 属性则表示这个patcher已经执行过 start 方法了.
-# 如果尚未拥有 is_local 属性则表示这个patcher还没有执行过 start 方法.
+# 该函数用于检查和判断 patcher 对象的 is_local 属性,
+# 如果 is_local 不是 _not_started 则表示这个patcher已经执行过 start 方法了.
+# 如果 is_local 是 _not_started 则表示这个patcher还没有执行过 start 方法.
+#
+# _patch 在 __init__ 中把 is_local 初始化为 _not_started, __exit__ 时再恢复成 _not_started;
+# 这样检查的时候属性总是存在, 不会像 hasattr 那样在未启动时构造一个 AttributeError.
 #######################################################################################################################
 def _is_started(patcher):
-    # XXXX horrible
-    return hasattr(patcher, 'is_local')
+    return getattr(patcher, 'is_local', _not_started) is not _not_started
+
+
+# 这些属性即使 delattr 之后通过 hasattr 也总能取到(函数/类自带), 所以 __exit__ 时必须显式 setattr 恢复.
+_restore_by_setattr = frozenset({
+    '__doc__', '__module__', '__defaults__', '__annotations__',
+    '__kwdefaults__',
+})
 
 
 class _patch(object):
 
-    attribute_name = None
-    _active_patches = []
+    # _patch 的属性是固定的一组, 用 __slots__ 代替实例 __dict__:
+    # 属性读写走 slot 描述符, 同时每个 patcher 实例也更省内存.
+    # target / temp_original 只在 __enter__ 到 __exit__ 之间存在; 新增属性时需要同步加到这里.
+    __slots__ = (
+        'getter', 'attribute', 'new', 'new_callable', 'spec', 'create',
+        'has_local', 'spec_set', 'autospec', 'kwargs', 'additional_patchers',
+        'attribute_name', 'target', 'temp_original', 'is_local',
+    )
+
+    # 已经 start 的 patcher: {id(patcher): patcher}.
+    # 用 dict 代替 list, stop 时按 key 删除是 O(1); dict 保持插入顺序, _patch_stopall 仍然可以按 LIFO 顺序停止.
+    _active_patches = {}
 
     ###################################################################################################################
     # __init__
@@ -2482,6 +2823,8 @@ class _patch(object):
         self.autospec = autospec
         self.kwargs = kwargs
         self.additional_patchers = []
+        self.attribute_name = None
+        self.is_local = _not_started
 
     ###################################################################################################################
     # copy(self)
@@ -2491,17 +2834,27 @@ class _patch(object):
     # 2. 将 self 的 attribute_name 赋值给 新patch 对象.
     # 3. 递归赋值 self.addtional_patchers 给 新patch.addtional_patchers;
     #    这里采用 p.copy() for p in self.addtional_patchers 的方式, 实现了deep-copy, 而不是shadow-copy.
+    #
+    # self 的参数已经通过了 __init__ 的冲突检查, 所以这里不再调用 __init__, 而是直接给各个 slot 赋值;
+    # 只复制 __init__ 设置的属性(不复制 __enter__ 产生的 target/temp_original 等运行期状态), 新增属性时需要与 __init__ 保持同步.
     ###################################################################################################################
     def copy(self):
-        patcher = _patch(
-            self.getter, self.attribute, self.new, self.spec,
-            self.create, self.spec_set,
-            self.autospec, self.new_callable, self.kwargs
-        )
-        patcher.attribute_name = self.attribute_name
+        patcher = _patch.__new__(_patch)
+        patcher.getter = self.getter
+        patcher.attribute = self.attribute
+        patcher.new = self.new
+        patcher.new_callable = self.new_callable
+        patcher.spec = self.spec
+        patcher.create = self.create
+        patcher.has_local = False
+        patcher.spec_set = self.spec_set
+        patcher.autospec = self.autospec
+        patcher.kwargs = self.kwargs
         patcher.additional_patchers = [
             p.copy() for p in self.additional_patchers
         ]
+        patcher.attribute_name = self.attribute_name
+        patcher.is_local = _not_started
         return patcher
 
     ###################################################################################################################
@@ -2514,6 +2867,14 @@ class _patch(object):
         if isinstance(func, type):
             return self.decorate_class(func)
 
+        # 当 func 拥有 patchings 属性时, 表示它是叠加的 @patch 已经生成的 patched 函数,
+        # decorate_callable 和 decorate_async_callable 对它的处理是一样的(都是追加到 patchings 中),
+        # 所以这里直接追加, 不需要再执行 inspect.iscoroutinefunction 判断.
+        patchings = getattr(func, 'patchings', _missing)
+        if patchings is not _missing:
+            patchings.append(self)
+            return func
+
         # 当 func 类型时 async function 时, 说明他时一个异步函数对象.
         if inspect.iscoroutinefunction(func):
             return self.decorate_async_callable(func)
@@ -2521,11 +2882,19 @@ class _patch(object):
         # 当 func 类型是 function 时, 说明他是一个函数对象.
         return self.decorate_callable(func)
 
+    ###################################################################################################################
+    # decorate_class(self, klass)
+    # 该方法为 klass 中所有以 patch.TEST_PREFIX 开头的可调用属性(包括从基类继承的)分别套上一个 patcher 的副本.
+    #
+    # dir(klass) 等于 klass.__mro__ 中每个类的 __dict__ 的名字合集(排序后的列表);
+    # 这里直接遍历 __mro__ 的 __dict__ 并先按前缀过滤, 省去构造和排序完整的 dir 列表.
+    # 属性值仍然通过 getattr(klass, attr) 读取, 以保持描述符(staticmethod, classmethod ...)的解析结果不变.
+    ###################################################################################################################
     def decorate_class(self, klass):
-        for attr in dir(klass):
-            if not attr.startswith(patch.TEST_PREFIX):
-                continue
-
+        prefix = patch.TEST_PREFIX
+        names = {attr for base in klass.__mro__ for attr in base.__dict__
+                 if attr.startswith(prefix)}
+        for attr in sorted(names):
             attr_value = getattr(klass, attr)
             if not hasattr(attr_value, "__call__"):
                 continue
@@ -2552,11 +2921,42 @@ class _patch(object):
     ###################################################################################################################
     @contextlib.contextmanager
     def decoration_helper(self, patched, args, keywargs):
+        args, keywargs, entered_patchers = self._enter_patchings(patched, args, keywargs)
+
+        exc_info = ()
+        try:
+            # 这里使用 yield 的原因是, 为了配合 contextmanager 的运行机制.
+            # contextmanager.__enter__() 触发前半部分的yield代码,
+            yield (args, keywargs)
+        except BaseException as exc:
+            # Pass the exception to __exit__
+            exc_info = (type(exc), exc, exc.__traceback__)
+            # re-raise the exception
+            raise
+        finally:
+            # contextmanager.__exit__() 触发后半部分的yield代码.
+            for patching in reversed(entered_patchers):
+                patching.__exit__(*exc_info)
+
+    ###################################################################################################################
+    # _enter_patchings(self, patched, args, keywargs)
+    # 该方法是 decoration_helper 的前半部分: 依次执行 patched.patchings 中每个 patcher 的 __enter__,
+    # 返回 (args, keywargs, entered_patchers); 调用方负责在结束时倒序执行 entered_patchers 的 __exit__.
+    # 如果某个 patcher 在 __enter__ 时抛出异常, 这里会先回滚已经进入的 patcher, 然后重新抛出异常.
+    #
+    # decorate_callable 和 decorate_async_callable 生成的 patched 函数直接使用这个方法并自己 try/finally,
+    # 每次调用被装饰的函数时不再需要创建 contextmanager 的 generator 对象.
+    ###################################################################################################################
+    def _enter_patchings(self, patched, args, keywargs):
         extra_args = []
         entered_patchers = []
         patching = None
 
-        exc_info = tuple()
+        # 循环中用到的列表方法先读取到局部变量中.
+        # 注意: 这里不缓存每个 patcher 的 __enter__/__exit__ 绑定方法, 因为 patched.patchings 可以在任何时候被修改.
+        add_extra_arg = extra_args.append
+        add_entered = entered_patchers.append
+
         try:
             for patching in patched.patchings:
                 # patching 是一个 _patch 对象, _patch.__enter__() 将会
@@ -2564,7 +2964,7 @@ class _patch(object):
                 arg = patching.__enter__()
 
                 # 这里标记, patching 这个对象已经执行了 __enter__ 函数, mock对象已经生成完毕.
-                entered_patchers.append(patching)
+                add_entered(patching)
 
                 # 如果 patching.attribute_name 的值存在, 那么就把这个值写入到 keywargs 中当作参数返回给上层函数.
                 if patching.attribute_name is not None:
@@ -2572,27 +2972,21 @@ class _patch(object):
 
                 # 如果 patching.new 是默认值, 那么就将 mock 当作参数返回给上层函数.
                 elif patching.new is DEFAULT:
-                    extra_args.append(arg)
-
-            args += tuple(extra_args)
-
-            # 这里使用 yield 的原因是, 为了配合 contextmanager 的运行机制.
-            # contextmanager.__enter__() 触发前半部分的yield代码,
-            yield (args, keywargs)
-        except:
+                    add_extra_arg(arg)
+        except BaseException as exc:
             if (patching not in entered_patchers and
                 _is_started(patching)):
                 # the patcher may have been started, but an exception
                 # raised whilst entering one of its additional_patchers
                 entered_patchers.append(patching)
             # Pass the exception to __exit__
-            exc_info = sys.exc_info()
-            # re-raise the exception
-            raise
-        finally:
-            # contextmanager.__exit__() 触发后半部分的yield代码.
+            exc_info = (type(exc), exc, exc.__traceback__)
             for patching in reversed(entered_patchers):
                 patching.__exit__(*exc_info)
+            # re-raise the exception
+            raise
+
+        return args + tuple(extra_args), keywargs, entered_patchers
 
     ###################################################################################################################
     # decorate_callable(self, func)
@@ -2611,11 +3005,18 @@ class _patch(object):
         @wraps(func)
         def patched(*args, **keywargs):
             # 前面从patch到_patch.__call__到这里, 一直是框架性流转代码,
-            # 进入self.decoration_helper才是具体创建对象的逻辑(是MagicMock还是AsyncMock还是new).
-            with self.decoration_helper(patched,
-                                        args,
-                                        keywargs) as (newargs, newkeywargs):
+            # 进入self._enter_patchings才是具体创建对象的逻辑(是MagicMock还是AsyncMock还是new).
+            # 这里与 with self.decoration_helper(...) 的行为一致, 只是省去了 contextmanager 的开销.
+            newargs, newkeywargs, entered_patchers = self._enter_patchings(patched, args, keywargs)
+            exc_info = ()
+            try:
                 return func(*newargs, **newkeywargs)
+            except BaseException as exc:
+                exc_info = (type(exc), exc, exc.__traceback__)
+                raise
+            finally:
+                for patching in reversed(entered_patchers):
+                    patching.__exit__(*exc_info)
 
         # 为装饰器 patched 函数添加 patchings 属性, 用于表示当前这个函数已经patch过了.
         patched.patchings = [self]
@@ -2633,36 +3034,43 @@ class _patch(object):
 
         @wraps(func)
         async def patched(*args, **keywargs):
-            with self.decoration_helper(patched,
-                                        args,
-                                        keywargs) as (newargs, newkeywargs):
+            newargs, newkeywargs, entered_patchers = self._enter_patchings(patched, args, keywargs)
+            exc_info = ()
+            try:
                 return await func(*newargs, **newkeywargs)
+            except BaseException as exc:
+                exc_info = (type(exc), exc, exc.__traceback__)
+                raise
+            finally:
+                for patching in reversed(entered_patchers):
+                    patching.__exit__(*exc_info)
 
         patched.patchings = [self]
         return patched
 
     ###################################################################################################################
-    # get_original(self)
+    # get_original(self, target=_missing)
     # 该方法用于提取 _get_target 没有直接提取的结果.
+    # __enter__ 已经调用过 self.getter(), 会把结果通过 target 传进来, 避免再次执行 getter (例如再走一遍 _importer).
     ###################################################################################################################
-    def get_original(self):
+    def get_original(self, target=_missing):
         # target 是一个 module 对象
         # name 是这个 module 对象中的一个函数/类/方法的名字
-        target = self.getter()
+        if target is _missing:
+            target = self.getter()
         name = self.attribute
 
-        original = DEFAULT
-        local = False
+        # 从 target 模块中提取 name 这个类对象.
+        # 这里使用 getattr/get 的默认值来判断是否存在, 不论命中与否都不会构造异常对象.
+        # (target 可能没有 __dict__, 例如使用了 __slots__ 的实例; 类的 __dict__ 是 mappingproxy, 同样支持 get.)
+        target_dict = getattr(target, '__dict__', None)
+        original = _missing if target_dict is None else target_dict.get(name, _missing)
 
-        try:
-            # 从 target 模块中提取 name 这个类对象.
-            original = target.__dict__[name]
-        except (AttributeError, KeyError):
+        # local == True 表示 从 target 这模块中获取 name 这个方法是无报错的.
+        # 当 local == True 时, original也是一个具体的类.
+        local = original is not _missing
+        if not local:
             original = getattr(target, name, DEFAULT)
-        else:
-            # local == True 表示 从 target 这模块中获取 name 这个方法是无报错的.
-            # 当 local == True 时, original也是一个具体的类.
-            local = True
 
         if name in _builtins and isinstance(target, ModuleType):
             self.create = True
@@ -2709,54 +3117,54 @@ class _patch(object):
 
         # 提取 _get_target 没有直接提取的结果.
         # original 将会被写入到 spec 或 spec_set 限定对象.
-        original, local = self.get_original()
+        original, local = self.get_original(self.target)
 
         # 这是最常见的条件入口: 当new是默认值, autospec是None时(也是默认值), 进入这个条件块.
         if new is DEFAULT and autospec is None:
             inherit = False
 
-            # 如果 spec 限定参数是True, 那么就将original这个对象当作 spec 对象.
-            if spec is True:
-                # set spec to the object we are replacing
-                spec = original
-                # 如果 spec 和 spec_set 同时都设定为True, 那么就以 spec_set 为主.
-                if spec_set is True:
-                    spec_set = original
-                    spec = None
+            # 最常见的情况是 spec 和 spec_set 都没有提供, 此时下面这些 spec 归一化分支都不会命中, 直接跳过.
+            if spec is not None or spec_set is not None:
 
-            # 如果 spec 不是True, 也不是 None, 那就是一个对象.
-            elif spec is not None:
-                # 如果 spec_set 是 True, 那么就以 spec_set 为主.
-                if spec_set is True:
-                    spec_set = spec
-                    spec = None
+                # 如果 spec 限定参数是True, 那么就将original这个对象当作 spec 对象.
+                if spec is True:
+                    # set spec to the object we are replacing
+                    spec = original
+                    # 如果 spec 和 spec_set 同时都设定为True, 那么就以 spec_set 为主.
+                    if spec_set is True:
+                        spec_set = original
+                        spec = None
+
+                # 如果 spec 不是True, 也不是 None, 那就是一个对象.
+                elif spec is not None:
+                    # 如果 spec_set 是 True, 那么就以 spec_set 为主.
+                    if spec_set is True:
+                        spec_set = spec
+                        spec = None
 
-            # 如果 spec_set 是 True, 那么就以 spec_set 为主.
-            elif spec_set is True:
-                spec_set = original
+                # 如果 spec_set 是 True, 那么就以 spec_set 为主.
+                elif spec_set is True:
+                    spec_set = original
 
-            # TODO: 看不懂
-            if spec is not None or spec_set is not None:
+                # TODO: 看不懂
                 if original is DEFAULT:
                     raise TypeError("Can't use 'spec' with create=True")
                 if isinstance(original, type):
                     # If we're patching out a class and there is a spec
                     inherit = True
 
-            # 如果 original (被替换的对象) 是一个异步对象, 那么就准备 AsyncMock 对象.
-            if spec is None and _is_async_obj(original):
-                Klass = AsyncMock
-            else:
-                Klass = MagicMock
-
             _kwargs = {}
 
-            # new_callable 的优先级高于 spec 和 spec_set.
+            # new_callable 的优先级高于 spec 和 spec_set, 此时不再需要判断 original 是不是异步对象.
             if new_callable is not None:
                 Klass = new_callable
 
+            # 没有 spec / spec_set 时, 只看 original (被替换的对象) 是不是一个异步对象.
+            elif spec is None and spec_set is None:
+                Klass = AsyncMock if _is_async_obj(original) else MagicMock
+
             # 如果 spec 或 spec_set 是一个对象.
-            elif spec is not None or spec_set is not None:
+            else:
                 this_spec = spec
                 if spec_set is not None:
                     this_spec = spec_set
@@ -2779,6 +3187,12 @@ class _patch(object):
                 elif not_callable:
                     Klass = NonCallableMagicMock
 
+                # 只提供了 spec_set 时, 仍然根据 original 是否是异步对象来选择.
+                elif spec is None and _is_async_obj(original):
+                    Klass = AsyncMock
+                else:
+                    Klass = MagicMock
+
             # 接下来的代码是为 klass 准备参数.
             if spec is not None:
                 _kwargs['spec'] = spec
@@ -2865,7 +3279,7 @@ class _patch(object):
     # 回滚patch替换.
     # 1. 将 self.target 这个module 中的 self.attribute(原始函数名) 名字恢复成 self.temp_original(原始函数) 函数.
     # 2. 删除 self.temp_original
-    # 3. 删除 self.is_local
+    # 3. 将 self.is_local 恢复成 _not_started
     # 4. 删除 self.target 模块
     # 5. 递归回滚所有子patcher
     ###################################################################################################################
@@ -2878,15 +3292,13 @@ class _patch(object):
             setattr(self.target, self.attribute, self.temp_original)
         else:
             delattr(self.target, self.attribute)
-            if not self.create and (not hasattr(self.target, self.attribute) or
-                        self.attribute in ('__doc__', '__module__',
-                                           '__defaults__', '__annotations__',
-                                           '__kwdefaults__')):
+            if not self.create and (self.attribute in _restore_by_setattr or
+                        not hasattr(self.target, self.attribute)):
                 # needed for proxy objects like django settings
                 setattr(self.target, self.attribute, self.temp_original)
 
         del self.temp_original
-        del self.is_local
+        self.is_local = _not_started
         del self.target
         for patcher in reversed(self.additional_patchers):
             if _is_started(patcher):
@@ -2899,7 +3311,7 @@ class _patch(object):
     def start(self):
         """Activate a patch, returning any created mock."""
         result = self.__enter__()
-        self._active_patches.append(self)
+        self._active_patches[id(self)] = self
         return result
 
     ###################################################################################################################
@@ -2908,11 +3320,8 @@ class _patch(object):
     ###################################################################################################################
     def stop(self):
         """Stop an active patch."""
-        try:
-            self._active_patches.remove(self)
-        except ValueError:
-            # If the patch hasn't been started this will fail
-            pass
+        # If the patch hasn't been started there is nothing to remove
+        self._active_patches.pop(id(self), None)
 
         return self.__exit__()
 
@@ -3014,10 +3423,11 @@ def _patch_multiple(target, spec=None, create=False, spec_set=None,
             'Must supply at least one keyword argument with patch.multiple'
         )
 
-    # need to wrap in a list for python 3, where items is a view
     # 第一个元素用来生成替换对象: 主patcher.
-    items = list(kwargs.items())
-    attribute, new = items[0]
+    # 这里直接在 kwargs.items() 上使用迭代器, 取出第一个元素后剩下的继续迭代,
+    # 不需要先 list(kwargs.items()) 再切片 items[1:] (只有一个关键字参数时, 这两个列表都是多余的).
+    items = iter(kwargs.items())
+    attribute, new = next(items)
     patcher = _patch(
         getter, attribute, new, spec, create, spec_set,
         autospec, new_callable, {}
@@ -3026,7 +3436,7 @@ def _patch_multiple(target, spec=None, create=False, spec_set=None,
 
     # 第二个和后续的元素, 用来创建其他(副)mock对象,
     # 然后将这些mock对象纳入到主patcher.additional_patchers中.
-    for attribute, new in items[1:]:
+    for attribute, new in items:
         this_patcher = _patch(
             getter, attribute, new, spec, create, spec_set,
             autospec, new_callable, {}
@@ -3193,13 +3603,19 @@ class _patch_dict(object):
 
 
     def decorate_class(self, klass):
-        for attr in dir(klass):
+        # 与 _patch.decorate_class 一样, 只从 klass.__mro__ 各层的 __dict__ 中收集以 TEST_PREFIX 开头的名字,
+        # 不再对 dir(klass) 的全部属性逐个 getattr.
+        prefix = patch.TEST_PREFIX
+        names = {attr for base in klass.__mro__ for attr in base.__dict__
+                 if attr.startswith(prefix)}
+        for attr in sorted(names):
             attr_value = getattr(klass, attr)
-            if (attr.startswith(patch.TEST_PREFIX) and
-                 hasattr(attr_value, "__call__")):
-                decorator = _patch_dict(self.in_dict, self.values, self.clear)
-                decorated = decorator(attr_value)
-                setattr(klass, attr, decorated)
+            if not hasattr(attr_value, "__call__"):
+                continue
+
+            decorator = _patch_dict(self.in_dict, self.values, self.clear)
+            decorated = decorator(attr_value)
+            setattr(klass, attr, decorated)
         return klass
 
     ###################################################################################################################
@@ -3228,6 +3644,14 @@ class _patch_dict(object):
         in_dict = self.in_dict
         clear = self.clear
 
+        # 最常见的情况是真正的 dict (例如 sys.modules), 直接调用 dict 的方法, 不需要走下面兼容 dict-like 对象的分支.
+        if type(in_dict) is dict:
+            self._original = in_dict.copy()
+            if clear:
+                in_dict.clear()
+            in_dict.update(values)
+            return
+
         # 将原始值保存到 self._original 中.
         try:
             original = in_dict.copy()
@@ -3262,6 +3686,12 @@ class _patch_dict(object):
         in_dict = self.in_dict
         original = self._original
 
+        # 真正的 dict 直接清空并写回.
+        if type(in_dict) is dict:
+            in_dict.clear()
+            in_dict.update(original)
+            return
+
         # 清空 self.in_dict 字典
         _clear_dict(in_dict)
 
@@ -3288,18 +3718,36 @@ class _patch_dict(object):
     stop = __exit__
 
 
+#######################################################################################################################
+# _clear_dict(in_dict)
+# 清空 in_dict: 优先使用 clear(); 没有 clear 但有 popitem 的 dict-like 对象就地 popitem 直到为空(KeyError),
+# 不需要先用 list(in_dict) 复制一份全部的 key; 两者都没有时才退回到复制 key 再逐个删除.
+#######################################################################################################################
 def _clear_dict(in_dict):
     try:
         in_dict.clear()
+        return
+    except AttributeError:
+        pass
+
+    try:
+        popitem = in_dict.popitem
     except AttributeError:
         keys = list(in_dict)
         for key in keys:
             del in_dict[key]
+        return
+
+    try:
+        while True:
+            popitem()
+    except KeyError:
+        pass
 
 
 def _patch_stopall():
     """Stop all active patches. LIFO to unroll nested patches."""
-    for patch in reversed(_patch._active_patches):
+    for patch in reversed(list(_patch._active_patches.values())):
         patch.stop()
 
 
@@ -3335,19 +3783,28 @@ right = ' '.join('r%s' % n for n in numerics.split())
 # (as they are metaclass methods)
 # __del__ is not supported at all as it causes problems if it exists
 
-_non_defaults = {
+_non_defaults = frozenset({
     '__get__', '__set__', '__delete__', '__reversed__', '__missing__',
     '__reduce__', '__reduce_ex__', '__getinitargs__', '__getnewargs__',
     '__getstate__', '__setstate__', '__getformat__', '__setformat__',
     '__repr__', '__dir__', '__subclasses__', '__format__',
     '__getnewargs_ex__',
-}
+})
 
 
-def _get_method(name, func):
-    "Turns a callable object (like a mock) into a real function"
+#######################################################################################################################
+# _get_magic_method(name)
+# 该函数返回一个安装在 type(mock) 上的魔法方法, 它调用的是 mock 实例 __dict__ 中的同名对象
+# (NonCallableMock.__setattr__ 会把 partial(value, self) 写入实例的 __dict__).
+#
+# 因为它只依赖 name, 所以每个名字只需要创建一次(lru_cache), 并且所有mock共享;
+# 重复给同一个魔法方法赋值时, type(mock) 上已经是这个方法了, 只需要更新实例的 __dict__, 不需要再修改类.
+#######################################################################################################################
+@lru_cache(maxsize=None)
+def _get_magic_method(name):
+    "Returns a real function that calls the callable stored on the instance"
     def method(self, /, *args, **kw):
-        return func(self, *args, **kw)
+        return self.__dict__[name](*args, **kw)
     method.__name__ = name
     return method
 
@@ -3362,10 +3819,12 @@ def _get_method(name, func):
 # '__next__', '__ceil__', '__imul__', '__ror__', '__iter__', '__eq__', '__ne__', '__or__', '__add__', '__rdivmod__',
 # '__floordiv__', '__rxor__', '__ifloordiv__', '__str__', '__len__', '__xor__', '__delitem__', '__matmul__', '__le__',
 # '__imatmul__', '__ipow__', '__enter__', '__setitem__', '__sub__'}
-_magics = {
-    '__%s__' % method for method in
+# '__%s__' % method 拼出来的字符串不会像源码中的字符串字面量那样被自动 intern,
+# 这里显式 intern, 之后在 _return_values / _calculate_return_value 等字面量 key 的字典中查找时可以直接按指针比较.
+_magics = frozenset({
+    sys.intern('__%s__' % method) for method in
     ' '.join([magic_methods, numerics, inplace, right]).split()
-}
+})
 
 # Magic methods used for async `with` statements
 # __aenter__ 和 __aexit__ 是配合 with 关键字语法完成特定机制的功能, 主要用于简化变量创建和变量回收工作.
@@ -3374,22 +3833,27 @@ _magics = {
 # 参考资料:
 # https://cloud.tencent.com/developer/article/1420997
 # https://www.python.org/dev/peps/pep-0525/
-_async_method_magics = {"__aenter__", "__aexit__", "__anext__"}
+_async_method_magics = frozenset({"__aenter__", "__aexit__", "__anext__"})
 
 # Magic methods that are only used with async calls but are synchronous functions themselves
 # __aiter__ 它是一个同步函数, 但也只有异步函数调用会触发它.
-_sync_async_magics = {"__aiter__"}
+_sync_async_magics = frozenset({"__aiter__"})
 _async_magics = _async_method_magics | _sync_async_magics
 
+# MagicMixin._mock_set_magics 每次实例化都要用到这个并集, 这里只计算一次.
+_orig_magics = _magics | _async_method_magics
+
+# 这几个集合只用于 in 判断(__setattr__ / __getattr__ / _get_child_mock 的热路径).
+# 上面的集合都已经是 frozenset, frozenset 之间的 | 运算结果仍然是 frozenset, 不需要再包一层 frozenset(...).
 _all_sync_magics = _magics | _non_defaults
 _all_magics = _all_sync_magics | _async_magics
 
-_unsupported_magics = {
+_unsupported_magics = frozenset({
     '__getattr__', '__setattr__',
     '__init__', '__new__', '__prepare__',
     '__instancecheck__', '__subclasscheck__',
     '__del__'
-}
+})
 
 _calculate_return_value = {
     '__hash__': lambda self: object.__hash__(self),
@@ -3415,67 +3879,76 @@ _return_values = {
 }
 
 
-def _get_eq(self):
-    def __eq__(other):
-        ret_val = self.__eq__._mock_return_value
-        if ret_val is not DEFAULT:
-            return ret_val
-        if self is other:
-            return True
-        return NotImplemented
-    return __eq__
-
-def _get_ne(self):
-    def __ne__(other):
-        if self.__ne__._mock_return_value is not DEFAULT:
-            return DEFAULT
-        if self is other:
-            return False
-        return NotImplemented
-    return __ne__
-
-def _get_iter(self):
-    def __iter__():
-        ret_val = self.__iter__._mock_return_value
-        if ret_val is DEFAULT:
-            return iter([])
-        # if ret_val was already an iterator, then calling iter on it should
-        # return the iterator unchanged
-        return iter(ret_val)
-    return __iter__
-
-def _get_async_iter(self):
-    def __aiter__():
-        ret_val = self.__aiter__._mock_return_value
-        if ret_val is DEFAULT:
-            return _AsyncIterator(iter([]))
-        return _AsyncIterator(iter(ret_val))
-    return __aiter__
+#######################################################################################################################
+# 下面这几个函数是 __eq__ / __ne__ / __iter__ / __aiter__ 的默认 side_effect.
+# _set_return_value 通过 partial(函数, mock) 绑定 mock, 不再为每个 mock 创建一个捕获 self 的闭包;
+# partial 在 C 层面拼接参数, 调用时也比闭包少一次 cell 读取.
+#######################################################################################################################
+def _eq_side_effect(self, other):
+    ret_val = self.__eq__._mock_return_value
+    if ret_val is not DEFAULT:
+        return ret_val
+    if self is other:
+        return True
+    return NotImplemented
+
+def _ne_side_effect(self, other):
+    if self.__ne__._mock_return_value is not DEFAULT:
+        return DEFAULT
+    if self is other:
+        return False
+    return NotImplemented
+
+def _iter_side_effect(self):
+    ret_val = self.__iter__._mock_return_value
+    if ret_val is DEFAULT:
+        return iter([])
+    # if ret_val was already an iterator, then calling iter on it should
+    # return the iterator unchanged
+    return iter(ret_val)
+
+def _async_iter_side_effect(self):
+    ret_val = self.__aiter__._mock_return_value
+    if ret_val is DEFAULT:
+        return _AsyncIterator(iter([]))
+    return _AsyncIterator(iter(ret_val))
 
 _side_effect_methods = {
-    '__eq__': _get_eq,
-    '__ne__': _get_ne,
-    '__iter__': _get_iter,
-    '__aiter__': _get_async_iter
+    '__eq__': _eq_side_effect,
+    '__ne__': _ne_side_effect,
+    '__iter__': _iter_side_effect,
+    '__aiter__': _async_iter_side_effect
 }
 
 
+#######################################################################################################################
+# _magic_defaults
+# 把上面三张表合并成一张: name -> (fixed, return_calculator, side_effector),
+# _set_return_value 只需要查一次字典; 大多数魔法方法(例如 __getitem__)不在表中, 查一次就可以返回.
+# 按 side_effect -> calculate -> fixed 的顺序写入, 同名时保持原来 fixed 优先于 calculate 优先于 side_effect 的顺序.
+#######################################################################################################################
+_magic_defaults = {}
+for _name, _side_effector in _side_effect_methods.items():
+    _magic_defaults[_name] = (DEFAULT, None, _side_effector)
+for _name, _return_calculator in _calculate_return_value.items():
+    _magic_defaults[_name] = (DEFAULT, _return_calculator, None)
+for _name, _fixed in _return_values.items():
+    _magic_defaults[_name] = (_fixed, None, None)
+del _name, _side_effector, _return_calculator, _fixed
 
-def _set_return_value(mock, method, name):
-    fixed = _return_values.get(name, DEFAULT)
-    if fixed is not DEFAULT:
-        method.return_value = fixed
-        return
 
-    return_calculator = _calculate_return_value.get(name)
-    if return_calculator is not None:
-        return_value = return_calculator(mock)
-        method.return_value = return_value
+def _set_return_value(mock, method, name):
+    defaults = _magic_defaults.get(name)
+    if defaults is None:
         return
 
-    side_effector = _side_effect_methods.get(name)
-    if side_effector is not None:
-        method.side_effect = side_effector(mock)
+    fixed, return_calculator, side_effector = defaults
+    if fixed is not DEFAULT:
+        method.return_value = fixed
+    elif return_calculator is not None:
+        method.return_value = return_calculator(mock)
+    else:
+        method.side_effect = partial(side_effector, mock)
 
 
 #######################################################################################################################
@@ -3488,8 +3961,13 @@ def _set_return_value(mock, method, name):
 class MagicMixin(Base):
     def __init__(self, /, *args, **kw):
         self._mock_set_magics()  # make magic work for kwargs in init
+        type_dict = type(self).__dict__
+        type_dict_len = len(type_dict)
         _safe_super(MagicMixin, self).__init__(*args, **kw)
-        self._mock_set_magics()  # fix magic broken by upper level init
+        # 上层 __init__ 既没有设置 spec, 也没有增删类属性时, 第二次调用不会有任何改动, 直接跳过.
+        if (self.__dict__.get('_mock_methods_set') is not None or
+                len(type_dict) != type_dict_len):
+            self._mock_set_magics()  # fix magic broken by upper level init
 
     ###################################################################################################################
     # _mock_set_magics(self)
@@ -3501,15 +3979,18 @@ class MagicMixin(Base):
         # &操作符: intersection
         # -操作符: difference
         # ^操作符: symmetric_difference
-        orig_magics = _magics | _async_method_magics
+        orig_magics = _orig_magics
         these_magics = orig_magics
 
         # 如果 self._mock_methods is not None 则表示 spec 或 spec_set 限定对象已经定义了.
         # orig_magics.intersection 的意思是 以 self._mock_metdhos 为主, 其他属性移除掉.
-        if getattr(self, "_mock_methods", None) is not None:
-            these_magics = orig_magics.intersection(self._mock_methods)
+        # 这里使用的是 frozenset 版本的 self._mock_methods_set(与 self._mock_methods 内容相同).
+        # 第一次调用发生在 NonCallableMock.__init__ 之前, 此时 __dict__ 中还没有这个属性;
+        # 直接读 __dict__, 不经过 getattr -> NonCallableMock.__getattr__ 抛出再捕获 AttributeError 的过程.
+        mock_methods = self.__dict__.get('_mock_methods_set')
+        if mock_methods is not None:
+            these_magics = orig_magics.intersection(mock_methods)
 
-            remove_magics = set()
             remove_magics = orig_magics - these_magics
 
             for entry in remove_magics:
@@ -3523,13 +4004,14 @@ class MagicMixin(Base):
         # 把相同的移除掉, 留下以 these_magics 为主的那些不同的.
         # 当 type(self).__dict__ 很少属性时, 那么下面要替换的魔法属性就很多.
         # 当 type(self).__dict__ 很多属性时, 那么下面要替换的魔法属性就很少甚至不替换.
+        # difference 可以直接接收 __dict__ (按 key 迭代), 不需要先构造一个 set(type(self).__dict__).
         # don't overwrite existing attributes if called a second time
-        these_magics = these_magics - set(type(self).__dict__)
+        _type = type(self)
+        these_magics = these_magics.difference(_type.__dict__)
 
         # TODO: 这里把Mock类对象剩余的属性替换为MagicProxy对象, 有什么用?
         # ANSERED: 替换成 MagicProxy 对象的作用是, 当调用了魔法属性时, 像mock那样,
         #          给它返回一个mock对象, 并且记录下来他调用了魔法属性.
-        _type = type(self)
         for entry in these_magics:
             setattr(_type, entry, MagicProxy(entry, self))
 
@@ -3549,8 +4031,13 @@ class NonCallableMagicMock(MagicMixin, NonCallableMock):
 class AsyncMagicMixin(MagicMixin):
     def __init__(self, /, *args, **kw):
         self._mock_set_magics()  # make magic work for kwargs in init
+        type_dict = type(self).__dict__
+        type_dict_len = len(type_dict)
         _safe_super(AsyncMagicMixin, self).__init__(*args, **kw)
-        self._mock_set_magics()  # fix magic broken by upper level init
+        # 上层 __init__ 既没有设置 spec, 也没有增删类属性时, 第二次调用不会有任何改动, 直接跳过.
+        if (self.__dict__.get('_mock_methods_set') is not None or
+                len(type_dict) != type_dict_len):
+            self._mock_set_magics()  # fix magic broken by upper level init
 
 class MagicMock(MagicMixin, Mock):
     """
@@ -3598,6 +4085,51 @@ class MagicProxy(Base):
         return self.create_mock()
 
 
+#######################################################################################################################
+# _lazy_code_mock(co_flags)
+# 该函数返回一个 __code__ 属性(property): 第一次访问时才创建 NonCallableMock(spec_set=CodeType) 并设置 co_flags,
+# 然后保存到实例的 __dict__ 中; 因为 NonCallableMock(spec_set=CodeType) 的创建成本很高, 而 __code__ 只在
+# inspect / asyncio 检查 co_flags 时才会用到.
+#
+# 使用方需要在 __init__ 中先放入 _missing 占位(self.__dict__['__code__'] = _missing),
+# 这样 del obj.__code__ 仍然会走到 __dict__ 的删除分支(由 deleter 标记为 _deleted, 之后访问抛出 AttributeError).
+# 每个实例仍然有自己的 code mock, 不在实例之间共享, 避免对 __code__ 的修改互相影响.
+#######################################################################################################################
+def _lazy_code_mock(co_flags):
+    def _get(self):
+        __dict__ = self.__dict__
+        code_mock = __dict__['__code__']
+        if code_mock is _missing:
+            code_mock = NonCallableMock(spec_set=CodeType)
+            code_mock.co_flags = co_flags
+            __dict__['__code__'] = code_mock
+        elif code_mock is _deleted:
+            raise AttributeError('__code__')
+        return code_mock
+    def _set(self, value):
+        self.__dict__['__code__'] = value
+    def _del(self):
+        self.__dict__['__code__'] = _deleted
+
+    return property(_get, _set, _del)
+
+
+#######################################################################################################################
+# _iscoroutinefunction_cached(mock, key, obj)
+# AsyncMockMixin._execute_mock_call 每次 await 都要判断 side_effect / wraps 是不是 coroutine 函数.
+# 这里把 (obj, 结果) 保存在 mock.__dict__[key] 中, 只有 obj 还是同一个对象时才复用结果;
+# side_effect / wraps 被替换后, 下一次调用会重新判断. 缓存中持有 obj 的引用, 所以不会出现 id 被复用的问题.
+#######################################################################################################################
+def _iscoroutinefunction_cached(mock, key, obj):
+    __dict__ = mock.__dict__
+    cached = __dict__.get(key)
+    if cached is not None and cached[0] is obj:
+        return cached[1]
+    result = asyncio.iscoroutinefunction(obj)
+    __dict__[key] = (obj, result)
+    return result
+
+
 #######################################################################################################################
 # class AsyncMockMixin(Base)
 # 该函数对标的是 NonCallableMock 对象.
@@ -3606,7 +4138,11 @@ class AsyncMockMixin(Base):
     # _mock_delegate
     await_count = _delegating_property('await_count')
     await_args = _delegating_property('await_args')
-    await_args_list = _delegating_property('await_args_list')
+    # await_args_list 与 call_args_list 一样是延迟分配的, 没有被 await 过的 AsyncMock 不需要分配这个列表.
+    await_args_list = _delegating_call_list('await_args_list')
+
+    # __code__ 在第一次访问时才创建, 见 _lazy_code_mock.
+    __code__ = _lazy_code_mock(inspect.CO_COROUTINE)
 
     def __init__(self, /, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -3619,10 +4155,8 @@ class AsyncMockMixin(Base):
         self.__dict__['_is_coroutine'] = asyncio.coroutines._is_coroutine
         self.__dict__['_mock_await_count'] = 0
         self.__dict__['_mock_await_args'] = None
-        self.__dict__['_mock_await_args_list'] = _CallList()
-        code_mock = NonCallableMock(spec_set=CodeType)
-        code_mock.co_flags = inspect.CO_COROUTINE
-        self.__dict__['__code__'] = code_mock
+        self.__dict__['_mock_await_args_list'] = None
+        self.__dict__['__code__'] = _missing
 
     ###################################################################################################################
     # async def _execute_mock_call(self, /, *args, **kwargs)
@@ -3642,7 +4176,9 @@ class AsyncMockMixin(Base):
         # 如果该self._mock_delegate对象不存在, 那么就返回 self._mock_await_count 对象.
         self.await_count += 1
         self.await_args = _call
-        self.await_args_list.append(_call)
+        # 与 _increment_mock_call 一样, 关闭了调用记录(_MOCK_TRACK_CALLS = False)时不再向 await_args_list 追加记录.
+        if _MOCK_TRACK_CALLS:
+            self.await_args_list.append(_call)
 
         effect = self.side_effect
         if effect is not None:
@@ -3659,7 +4195,7 @@ class AsyncMockMixin(Base):
                 if _is_exception(result):
                     raise result
             # 如果 effect 是一个 coroutine 函数, 那么就用 await 来执行.
-            elif asyncio.iscoroutinefunction(effect):
+            elif _iscoroutinefunction_cached(self, '_mock_side_effect_is_coroutine', effect):
                 result = await effect(*args, **kwargs)
             else:
                 result = effect(*args, **kwargs)
@@ -3670,10 +4206,11 @@ class AsyncMockMixin(Base):
         if self._mock_return_value is not DEFAULT:
             return self.return_value
 
-        if self._mock_wraps is not None:
-            if asyncio.iscoroutinefunction(self._mock_wraps):
-                return await self._mock_wraps(*args, **kwargs)
-            return self._mock_wraps(*args, **kwargs)
+        wraps = self._mock_wraps
+        if wraps is not None:
+            if _iscoroutinefunction_cached(self, '_mock_wraps_is_coroutine', wraps):
+                return await wraps(*args, **kwargs)
+            return wraps(*args, **kwargs)
 
         return self.return_value
 
@@ -3689,7 +4226,7 @@ class AsyncMockMixin(Base):
         """
         Assert that the mock was awaited exactly once.
         """
-        if not self.await_count == 1:
+        if self.await_count != 1:
             msg = (f"Expected {self._mock_name or 'mock'} to have been awaited once."
                    f" Awaited {self.await_count} times.")
             raise AssertionError(msg)
@@ -3707,7 +4244,7 @@ class AsyncMockMixin(Base):
             return msg
 
         expected = self._call_matcher((args, kwargs))
-        actual = self._call_matcher(self.await_args)
+        actual = self._recorded_call_matcher(self.await_args)
         if expected != actual:
             cause = expected if isinstance(expected, Exception) else None
             raise AssertionError(_error_message()) from cause
@@ -3717,7 +4254,7 @@ class AsyncMockMixin(Base):
         Assert that the mock was awaited exactly once and with the specified
         arguments.
         """
-        if not self.await_count == 1:
+        if self.await_count != 1:
             msg = (f"Expected {self._mock_name or 'mock'} to have been awaited once."
                    f" Awaited {self.await_count} times.")
             raise AssertionError(msg)
@@ -3727,8 +4264,11 @@ class AsyncMockMixin(Base):
         """
         Assert the mock has ever been awaited with the specified arguments.
         """
-        expected = self._call_matcher((args, kwargs))
-        actual = [self._call_matcher(c) for c in self.await_args_list]
+        matcher = self._call_matcher
+        expected = matcher((args, kwargs))
+        # 直接在 map 迭代器上做 in 判断: 找到第一个匹配的 await 就停止, 后面的记录不再执行 matcher.
+        # (迭代器的 in 与列表的 in 一样, 都是 item == expected 的比较顺序.)
+        actual = map(self._recorded_call_matcher, _peek_call_list(self, 'await_args_list'))
         if expected not in actual:
             cause = expected if isinstance(expected, Exception) else None
             expected_string = self._format_mock_call_signature(args, kwargs)
@@ -3748,9 +4288,10 @@ class AsyncMockMixin(Base):
         If `any_order` is True then the awaits can be in any order, but
         they must all appear in :attr:`await_args_list`.
         """
-        expected = [self._call_matcher(c) for c in calls]
+        matcher = self._call_matcher
+        expected = list(map(matcher, calls))
         cause = next((e for e in expected if isinstance(e, Exception)), None)
-        all_awaits = _CallList(self._call_matcher(c) for c in self.await_args_list)
+        all_awaits = _CallList(map(self._recorded_call_matcher, _peek_call_list(self, 'await_args_list')))
         if not any_order:
             if expected not in all_awaits:
                 if cause is None:
@@ -3767,12 +4308,13 @@ class AsyncMockMixin(Base):
                 ) from cause
             return
 
-        all_awaits = list(all_awaits)
-
+        # 与 assert_has_calls 一样, _Call 不可哈希, 不能用 Counter 做多重集合的差集;
+        # all_awaits 是上面新建的列表, 直接在它上面 remove, 不需要再复制一份.
+        remove = all_awaits.remove
         not_found = []
         for kall in expected:
             try:
-                all_awaits.remove(kall)
+                remove(kall)
             except ValueError:
                 not_found.append(kall)
         if not_found:
@@ -3796,7 +4338,10 @@ class AsyncMockMixin(Base):
         super().reset_mock(*args, **kwargs)
         self.await_count = 0
         self.await_args = None
-        self.await_args_list = _CallList()
+        if self._mock_delegate is None:
+            self.__dict__['_mock_await_args_list'] = None
+        else:
+            self.await_args_list = _CallList()
 
 
 #######################################################################################################################
@@ -3819,6 +4364,11 @@ class AsyncMockMixin(Base):
 #
 #      AsyncMock除了Mock那些不存在的对象之外, 还可以MagicMock那些双下划线的魔法方法.
 #######################################################################################################################
+# 所有的 _delegating_property / _delegating_call_list 都已经定义完毕,
+# _allowed_names 不会再增加成员, 这里将其冻结成 frozenset.
+_allowed_names = frozenset(_allowed_names)
+
+
 class AsyncMock(AsyncMockMixin, AsyncMagicMixin, Mock):
     """
     Enhance :class:`Mock` with features allowing to mock
@@ -3906,24 +4456,57 @@ ANY = _ANY()
 # _format_call_signature("hello", args=("3", 5), kwargs={"a": "one", "b": "two"}) 生成 hello('3', 5, a='one', b='two')
 #######################################################################################################################
 def _format_call_signature(name, args, kwargs):
-    message = '%s(%%s)' % name
-    formatted_args = ''
-    args_string = ', '.join([repr(arg) for arg in args])
-
-    # 重点:
-    # %s 是将字符串渲染出来
-    # %r 是将'字符串'渲染出来
-    kwargs_string = ', '.join([
-        '%s=%r' % (key, value) for key, value in kwargs.items()
+    # 位置参数用 repr 渲染, 关键字参数渲染成 key=repr(value), 最后一次性用 ', ' 拼接.
+    #
+    # 注意: 这里不做缓存(lru_cache), 因为相等的参数不一定有相同的 repr(例如: 1 == True == 1.0),
+    # 并且可变对象的 repr 会随着它的内容变化.
+    formatted_args = ', '.join([
+        *map(repr, args),
+        *[f'{key}={value!r}' for key, value in kwargs.items()],
     ])
-    if args_string:
-        formatted_args = args_string
-    if kwargs_string:
-        if formatted_args:
-            formatted_args += ', '
-        formatted_args += kwargs_string
+    return f'{name}({formatted_args})'
+
 
-    return message % formatted_args
+#######################################################################################################################
+# _normalize_call(value, name='')
+# 把 _Call 支持的各种简写形状统一转换成 (name, args, kwargs) 三元组, 供 _Call.__new__ 和 _Call.__eq__ 共用.
+# 约定格式如下:
+# ()                    # (name, (), {})
+# (name, )              # (name, (), {})
+# (args, )              # (name, args, {})
+# (kwargs, )            # (name, (), kwargs)
+# (name, args)          # (name, args, {})
+# (name, kwargs)        # (name, (), kwargs)
+# (args, kwargs)        # (name, args, kwargs)
+# (name, args, kwargs)  # (name, args, kwargs)
+# 其中 value 没有提供 name 时使用参数 name 作为默认值; 其他长度返回 None, 由调用方决定如何处理.
+#######################################################################################################################
+def _normalize_call(value, name=''):
+    _len = len(value)
+    if _len == 3:
+        name, args, kwargs = value
+        return name, args, kwargs
+    if _len == 2:
+        first, second = value
+        if isinstance(first, str):
+            if isinstance(second, tuple):
+                return first, second, {}
+            return first, (), second
+        return name, first, second
+    if _len == 1:
+        value, = value
+        if isinstance(value, str):
+            return value, (), {}
+        if isinstance(value, tuple):
+            return name, value, {}
+        return name, (), value
+    if _len == 0:
+        return name, (), {}
+    return None
+
+
+# _Call.__getattribute__ 每次访问属性都要判断 attr 是否是 tuple 自带的属性, 这里预先计算一次.
+_tuple_attrs = frozenset(tuple.__dict__)
 
 
 #######################################################################################################################
@@ -4020,29 +4603,23 @@ class _Call(tuple):
     """
     def __new__(cls, value=(), name='', parent=None, two=False,
                 from_kall=True):
-        args = ()
-        kwargs = {}
         _len = len(value)
-        if _len == 3:
-            name, args, kwargs = value                      # (name: str, args: tuple, kwargs: dict)
-        elif _len == 2:
-            first, second = value
-            if isinstance(first, str):
-                name = first
-                if isinstance(second, tuple):
-                    args = second                           # (name: str, args: tuple)
-                else:
-                    kwargs = second                         # (name: str, kwargs: dict)
-            else:
-                args, kwargs = first, second
-        elif _len == 1:
-            value, = value                                  # value, = value 等同于 value = value[0]
-            if isinstance(value, str):
-                name = value                                # (name: str, (), {})
-            elif isinstance(value, tuple):
-                args = value                                # ('', args: tuple, {})
-            else:
-                kwargs = value                              # ('', (), kwargs: dict)
+
+        # 最常见的两种形状直接构造 tuple, 不需要先拆包再重新打包:
+        # (name, args, kwargs) 三元组, 以及 call() / call.name() 这类没有任何参数的空 value.
+        if _len == 3 and not two:
+            return tuple.__new__(cls, value)
+        if _len == 0:
+            if two:
+                return tuple.__new__(cls, ((), {}))
+            return tuple.__new__(cls, (name, (), {}))
+
+        # 其余形状按 _normalize_call 的约定转换成 (name, args, kwargs).
+        normalized = _normalize_call(value, name)
+        if normalized is None:
+            args, kwargs = (), {}
+        else:
+            name, args, kwargs = normalized
 
         if two:
             return tuple.__new__(cls, (args, kwargs))       # ss = (args: tuple, kwargs: dict)
@@ -4055,6 +4632,26 @@ class _Call(tuple):
         self._mock_parent = parent
         self._mock_from_kall = from_kall
 
+    # _fast_two / _fast_three
+    # _increment_mock_call 在每次mock调用时都要创建若干个 _Call 对象, 并且参数的形状是已知的;
+    # 这两个方法跳过 __new__ 中对 value 的解析和 __init__ 的调用, 直接构造 tuple,
+    # 结果与 _Call((args, kwargs), two=True) 和 _Call((name, args, kwargs)) 完全一致.
+    @classmethod
+    def _fast_two(cls, args, kwargs):
+        self = tuple.__new__(cls, (args, kwargs))
+        self._mock_name = None
+        self._mock_parent = None
+        self._mock_from_kall = True
+        return self
+
+    @classmethod
+    def _fast_three(cls, name, args, kwargs):
+        self = tuple.__new__(cls, (name, args, kwargs))
+        self._mock_name = None
+        self._mock_parent = None
+        self._mock_from_kall = True
+        return self
+
     ###################################################################################################################
     # __eq__(self, other)
     # 该方法用于 == 比较操作, 主要是比较两个对象(参数)是否相等.
@@ -4088,52 +4685,16 @@ class _Call(tuple):
                 and self._mock_parent != other._mock_parent):
             return False
 
-        # 这一段代码的主要目的是从 other 中提取 other_args, other_kwargs 用于跟 self的args/kwargs 进行比较是否相等.
-        other_name = ''
-        # 当 len_other == 0 时, 表示没有提供参数, 并将 other_args 置为 (), 将 other_kwargs 置为 {};
-        if len_other == 0:
-            other_args, other_kwargs = (), {}
-        # 当 len_other == 3 时, 将 other 按约定格式提取成三份: other_name, other_args, other_kwargs
-        elif len_other == 3:
+        # 从 other 中提取 other_name, other_args, other_kwargs 用于跟 self 的 name/args/kwargs 进行比较是否相等.
+        # 三元组是最常见的形状, 直接拆包; 其余形状交给 _normalize_call 按 _Call.__new__ 相同的规则处理,
+        # 无法识别的形状(长度大于3)返回 None, 表示两个对象不相等.
+        if len_other == 3:
             other_name, other_args, other_kwargs = other
-        # 当 len_other == 1 时, 约定格式可能如下:
-        # (("hello"),)          # (args, )
-        # ("hello", )           # (name, )
-        # ({"h": "hello"},)     # (kwargs, )
-        # value, = other
-        # 得出两种可能的组合:
-        # ("hello")             # 这种格式满足: if isinstance(value, tuple)
-        # "hello"               # 这种格式满足: if isinstance(value, str)
-        # {"h", "hello"}        # 这种格式满足: else
-        # 其他情况将会是为定义行为, 会出现不可预期的错误和报错.
-        elif len_other == 1:
-            value, = other
-            if isinstance(value, tuple):
-                other_args = value
-                other_kwargs = {}
-            elif isinstance(value, str):
-                other_name = value
-                other_args, other_kwargs = (), {}
-            else:
-                other_args = ()
-                other_kwargs = value
-        # 当 len_other == 2 时, 约定格式可能如下:
-        # (name, args)          # 这种格式满足: if isinstance(first, str) 和 if isinstance(second, tuple)
-        # (name, kwargs)        # 这种格式满足: if isinstance(first, str) 和 else
-        # (args, kwargs)        # 这种格式满足: else
-        elif len_other == 2:
-            # could be (name, args) or (name, kwargs) or (args, kwargs)
-            first, second = other
-            if isinstance(first, str):
-                other_name = first
-                if isinstance(second, tuple):                       # (name, args)
-                    other_args, other_kwargs = second, {}
-                else:                                               # (name, kwargs)
-                    other_args, other_kwargs = (), second
-            else:                                                   # (args, kwargs)
-                other_args, other_kwargs = first, second
         else:
-            return False
+            normalized = _normalize_call(other)
+            if normalized is None:
+                return False
+            other_name, other_args, other_kwargs = normalized
 
         # 当 self_name 是一个具体值时, 就需要去比较它们是否相同,
         # 如果不相同, 那么就没有继续比较下去的必要.
@@ -4142,7 +4703,13 @@ class _Call(tuple):
 
         # this order is important for ANY to work!
         # name 比较完毕之后, 这里就不需要再继续比较, 只需要比较 args 和 kwargs 是否相等即可.
-        return (other_args, other_kwargs) == (self_args, self_kwargs)
+        # 这里不再构造 (other_args, other_kwargs) 和 (self_args, self_kwargs) 两个临时 tuple 来比较,
+        # 而是逐个比较; 仍然保持 other 在左边的顺序, 以及 tuple 比较时 "是同一个对象就视为相等" 的规则.
+        if not (other_args is self_args or other_args == self_args):
+            return False
+        if other_kwargs is self_kwargs or other_kwargs == self_kwargs:
+            return True
+        return False
 
 
     __ne__ = object.__ne__
@@ -4200,7 +4767,8 @@ class _Call(tuple):
         # '__getnewargs__', 'index', 'count', '__doc__']
         #
         # 如果 attr 这个属性 在 tuple.__dict__ 范围中, 那么就报错.
-        if attr in tuple.__dict__:
+        # _tuple_attrs 是 tuple.__dict__ 的 key 在模块加载时得到的 frozenset, 不需要每次访问属性都去读取 mappingproxy.
+        if attr in _tuple_attrs:
             raise AttributeError
 
         # 如果 attr 这个属性 不在 tuple.__dict 范围中, 那么就触发 __getattr__ 这个方法.
@@ -4325,11 +4893,13 @@ class _Call(tuple):
             # 递归处理父_Call对象.
             thing = thing._mock_parent
 
-        # 由于是从子到父递归添加到 vals 中, 这里采用 reversed 对列表进行反转, 使其对象顺序是: 从父到子的顺序.
-        # _CallList对象本身是一个列表, 所以 _CallList(reversed(vals)) 就是将一个列表对象.
+        # 由于是从子到父递归添加到 vals 中, 这里采用 vals.reverse() 原地反转列表, 使其对象顺序是: 从父到子的顺序.
+        # (原地反转后再用 list 构造 _CallList 会直接复制底层数组, 不需要再经过 reversed 迭代器逐个取值.)
+        # _CallList对象本身是一个列表, 所以 _CallList(vals) 就是将一个列表对象.
         # 但是由于 _CallList 这个对象存在的意义和目的是为了能够进行一段连续的匹配,
         # 所以这个函数的主要目的是为了将 vals 准备用来做一段连续的匹配.
-        return _CallList(reversed(vals))
+        vals.reverse()
+        return _CallList(vals)
 
 
 call = _Call(from_kall=False)
@@ -4460,7 +5030,8 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
                  name=_name, **_kwargs)
 
     # TODO: 这里看不是很明白.
-    if isinstance(spec, FunctionTypes):
+    spec_is_function = isinstance(spec, FunctionTypes)
+    if spec_is_function:
         # should only happen at the top level because we don't
         # recurse for functions
         mock = _set_signature(mock, spec)
@@ -4482,11 +5053,11 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
                                             _name='()', _parent=mock)
 
     # 下面这段代码的意思是: 为限定对象的属性(不含魔法属性)挨个创建一个mock对象, 然后写入到 mock._mock_children 中.
-    for entry in dir(spec):
-        if _is_magic(entry):
-            # MagicMock already does the useful magic methods for us
-            continue
-
+    # MagicMock already does the useful magic methods for us
+    # 魔法属性在进入循环之前就过滤掉; 判断条件与 _is_magic 相同, 这里直接内联, 省去每个属性一次函数调用.
+    entries = [entry for entry in dir(spec)
+               if not (entry[:2] == '__' and entry[-2:] == '__' and len(entry) > 3)]
+    for entry in entries:
         # XXXX do we need a better way of getting attributes without
         # triggering code execution (?) Probably not - we need the actual
         # object to mock it so we would rather trigger a property than mock
@@ -4501,10 +5072,6 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
         except AttributeError:
             continue
 
-        kwargs = {'spec': original}
-        if spec_set:
-            kwargs = {'spec_set': original}
-
         # 当 original 不是一个函数或方法时, 并不是创建一个mock对象, 而是创建 SpecState 对象,
         # 将 original(函数名或方法名), spec_set(bool), mock(parent), entry(name), instance(ids)
         # 这几个参数暂存到 _SpecState 对象中.
@@ -4517,9 +5084,13 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
         # 当 original 是一个函数或方法时
         else:
             parent = mock
-            if isinstance(spec, FunctionTypes):
+            if spec_is_function:
                 parent = mock.mock
 
+            kwargs = {'spec': original}
+            if spec_set:
+                kwargs = {'spec_set': original}
+
             skipfirst = _must_skip(spec, entry, is_type)
             kwargs['_eat_self'] = skipfirst
             if asyncio.iscoroutinefunction(original):
@@ -4532,12 +5103,13 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
             mock._mock_children[entry] = new
             _check_signature(original, new, skipfirst=skipfirst)
 
-        # so functions created with _set_signature become instance attributes,
-        # *plus* their underlying mock exists in _mock_children of the parent
-        # mock. Adding to _mock_children may be unnecessary where we are also
-        # setting as an instance attribute?
-        if isinstance(new, FunctionTypes):
-            setattr(mock, entry, new)
+            # so functions created with _set_signature become instance attributes,
+            # *plus* their underlying mock exists in _mock_children of the parent
+            # mock. Adding to _mock_children may be unnecessary where we are also
+            # setting as an instance attribute?
+            # (_SpecState 永远不会是函数, 所以这个判断只需要在函数分支中进行.)
+            if isinstance(new, FunctionTypes):
+                setattr(mock, entry, new)
 
     return mock
 
@@ -4594,6 +5166,10 @@ def _must_skip(spec, entry, is_type):
 #######################################################################################################################
 class _SpecState(object):
 
+    # create_autospec 会为 spec 的每一个非函数属性都创建一个 _SpecState, 属性是固定的一组,
+    # 用 __slots__ 代替实例 __dict__ 以节省内存.
+    __slots__ = ('spec', 'ids', 'spec_set', 'parent', 'instance', 'name')
+
     def __init__(self, spec, spec_set=False, parent=None,
                  name=None, ids=None, instance=False):
         self.spec = spec
@@ -4748,11 +5324,18 @@ def seal(mock):
     and all assigned mocks without a name or spec will be sealed.
     """
     mock._mock_sealed = True
-    for attr in dir(mock):
-        try:
-            m = getattr(mock, attr)
-        except AttributeError:
-            continue
+
+    # 子mock只可能保存在两个地方: _mock_children(属性/魔法方法产生的子mock) 和 __dict__(例如 _mock_return_value).
+    # 这里直接遍历这两个字典, 不再对 dir(mock) 的每个名字执行 getattr;
+    # 已经 seal 之后的 getattr 对不存在的属性只会抛出 AttributeError, 所以两种写法找到的子mock是一样的.
+    # 注意: create_autospec 暂存在 _mock_children 中的 _SpecState 还不是mock, 这里用 getattr 把它实例化出来再 seal,
+    #      否则这个属性第一次被访问时创建出来的子mock是没有 seal 的.
+    __dict__ = mock.__dict__
+    children = __dict__.get('_mock_children', {})
+    specced = [name for name, m in children.items() if isinstance(m, _SpecState)]
+    for name in specced:
+        getattr(mock, name)
+    for m in [*children.values(), *__dict__.values()]:
         if not isinstance(m, NonCallableMock):
             continue
         if m._mock_new_parent is mock:
@@ -4767,6 +5350,9 @@ class _AsyncIterator:
     """
     Wraps an iterator in an asynchronous iterator.
     """
+    # __code__ 在第一次访问时才创建, 见 _lazy_code_mock.
+    __code__ = _lazy_code_mock(inspect.CO_ITERABLE_COROUTINE)
+
     def __init__(self, iterator):
         # 这里将iterator对象暂存在self.iterator中, 后续做next/for(迭代)操作时, 操作 self.iterator 对象.
         self.iterator = iterator
@@ -4785,9 +5371,8 @@ class _AsyncIterator:
         # 即: __code__.co_flags == inspect.CO_ITERABLE_COROUTINE
         #
         # 这里声明: CO_ITERABLE_COROUTINE 是为了能够让 asyncio.iscoroutinefunction 识别出这是一个异步对象.
-        code_mock = NonCallableMock(spec_set=CodeType)
-        code_mock.co_flags = inspect.CO_ITERABLE_COROUTINE
-        self.__dict__['__code__'] = code_mock
+        # code_mock 推迟到第一次访问 __code__ 时才创建(见 _lazy_code_mock), 这里先放入 _missing 占位.
+        self.__dict__['__code__'] = _missing
 
     def __aiter__(self):
         return self
@@ -124,6 +124,42 @@ class AsyncMockTest(unittest.TestCase):
         self.assertTrue(asyncio.iscoroutinefunction(mock))
         self.assertTrue(inspect.iscoroutinefunction(mock))
 
+    def test_code_mock_created_lazily(self):
+        mock = AsyncMock()
+        code = mock.__code__
+        self.assertIs(mock.__code__, code)
+        self.assertEqual(code.co_flags, inspect.CO_COROUTINE)
+
+        mock.__code__ = sentinel.code
+        self.assertIs(mock.__code__, sentinel.code)
+        del mock.__code__
+        self.assertFalse(hasattr(mock, '__code__'))
+
+    def test_side_effect_reassigned_between_sync_and_async(self):
+        async def async_effect():
+            return 'async'
+
+        mock = AsyncMock(side_effect=lambda: 'sync')
+        self.assertEqual(asyncio.run(mock()), 'sync')
+        mock.side_effect = async_effect
+        self.assertEqual(asyncio.run(mock()), 'async')
+        mock.side_effect = lambda: 'sync again'
+        self.assertEqual(asyncio.run(mock()), 'sync again')
+
+    def test_await_args_list_allocated_lazily(self):
+        mock = AsyncMock()
+        mock.assert_has_awaits([])
+        self.assertIsNone(mock.__dict__['_mock_await_args_list'])
+
+        await_args_list = mock.await_args_list
+        asyncio.run(mock(1))
+        self.assertIs(mock.await_args_list, await_args_list)
+        self.assertEqual(await_args_list, [call(1)])
+
+        mock.reset_mock()
+        self.assertIsNone(mock.__dict__['_mock_await_args_list'])
+        self.assertEqual(mock.await_args_list, [])
+
     def test_isawaitable(self):
         mock = AsyncMock()
         m = mock()
@@ -117,6 +117,20 @@ class CallTest(unittest.TestCase):
         self.assertEqual(args, ({},))
 
 
+    def test_fast_constructors_match__Call(self):
+        args, kwargs = (1, 2), {'a': 3}
+        pairs = [
+            (_Call._fast_two(args, kwargs), _Call((args, kwargs), two=True)),
+            (_Call._fast_three('foo', args, kwargs), _Call(('foo', args, kwargs))),
+        ]
+        for fast, slow in pairs:
+            self.assertIs(type(fast), _Call)
+            self.assertEqual(tuple(fast), tuple(slow))
+            self.assertEqual(repr(fast), repr(slow))
+            for attr in '_mock_name', '_mock_parent', '_mock_from_kall':
+                self.assertEqual(getattr(fast, attr), getattr(slow, attr))
+
+
     def test_named_empty_call(self):
         args = _Call(('foo', (), {}))
 
@@ -1023,6 +1037,16 @@ class TestCallList(unittest.TestCase):
         self.assertNotIn([call('fish')], mock.call_args_list)
 
 
+    def test_call_list_contains_overlapping_prefix(self):
+        calls = _CallList([call(1), call(1), call(1), call(2)])
+        self.assertIn([call(1), call(1), call(2)], calls)
+        self.assertIn([call(1), call(2)], calls)
+        self.assertIn([], calls)
+        self.assertIn([], _CallList())
+        self.assertNotIn([call(1), call(2), call(1)], calls)
+        self.assertIn([call(ANY), call(2)], calls)
+
+
     def test_call_list_str(self):
         mock = Mock()
         mock(1, 2)
@@ -1038,6 +1062,29 @@ class TestCallList(unittest.TestCase):
         self.assertEqual(str(mock.mock_calls), expected)
 
 
+    def test_call_list_repr_tracks_mutation(self):
+        calls = _CallList([call(1)])
+        self.assertEqual(repr(calls), "[call(1)]")
+        calls.append(call(2))
+        self.assertEqual(repr(calls), "[call(1), call(2)]")
+        calls[0] = call(3)
+        self.assertEqual(repr(calls), "[call(3), call(2)]")
+        calls.reverse()
+        self.assertEqual(repr(calls), "[call(2), call(3)]")
+        calls.pop()
+        calls.append(call(4))
+        self.assertEqual(repr(calls), "[call(2), call(4)]")
+        calls.clear()
+        self.assertEqual(repr(calls), "[]")
+
+        mock = Mock()
+        arg = [1]
+        mock(arg)
+        self.assertEqual(repr(mock.call_args_list), "[call([1])]")
+        arg.append(2)
+        self.assertEqual(repr(mock.call_args_list), "[call([1, 2])]")
+
+
     def test_propertymock(self):
         p = patch('%s.SomeClass.one' % __name__, new_callable=PropertyMock)
         mock = p.start()
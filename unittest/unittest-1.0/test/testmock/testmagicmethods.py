@@ -47,6 +47,36 @@ class TestMockingMagicMethods(unittest.TestCase):
         self.assertIs(mock.__getitem__, mock)
 
 
+    def test_magic_method_reassignment(self):
+        mock = Mock()
+        mock.__getitem__ = lambda self, key: 'fish'
+        method = type(mock).__dict__['__getitem__']
+        mock.__getitem__ = lambda self, key: (self, key)
+        self.assertIs(type(mock).__dict__['__getitem__'], method)
+        self.assertEqual(mock['foo'], (mock, 'foo'))
+
+        other = Mock()
+        other.__getitem__ = lambda self, key: 'chips'
+        self.assertEqual(other['foo'], 'chips')
+        self.assertEqual(mock['foo'], (mock, 'foo'))
+
+        mock.__getitem__ = Mock(return_value=3)
+        self.assertEqual(mock['foo'], 3)
+        mock.__getitem__ = lambda self, key: key
+        self.assertEqual(mock['foo'], 'foo')
+
+
+    def test_non_callable_magic_method_assignment(self):
+        mock = Mock()
+        mock.__hash__ = None
+        self.assertRaises(TypeError, hash, mock)
+
+        mock.__len__ = 3
+        self.assertRaises(TypeError, len, mock)
+
+        mock.__len__ = lambda s: 4
+        self.assertEqual(len(mock), 4)
+
     def test_magic_methods_isolated_between_mocks(self):
         mock1 = Mock()
         mock2 = Mock()
@@ -1,4 +1,6 @@
+import asyncio
 import copy
+import inspect
 import re
 import sys
 import tempfile
@@ -85,7 +87,7 @@ class MockTest(unittest.TestCase):
     # mock.call_count = 0        等于访问 mock._mock_call_count, 它初始化(在NonCallableMock.__init__中)的值是 0.
     # mock.call_args = None      等于访问 mock._mock_call_args, 它初始化(在NonCallableMock.__init__中)的值是 None.
     # mock.call_args_list = []   等于访问 mock._mock_call_args_list, 它初始化(在NonCallableMock.__init__中)的值是 [].
-    # mock.method_calls = []     等于访问 mock._mock_method_calls, 它初始化(在NonCallableMock.__init__中)的值是 _CallList().
+    # mock.method_calls = []     等于访问 mock._mock_method_calls, 它初始化(在NonCallableMock.__init__中)的值是 None, 第一次访问时才分配 _CallList().
     #
     # mock.return_value          等于访问 NonCallableMock.__get_return_value,
     #                            1. 如果初始化Mock时提供了return_value参数,
@@ -216,6 +218,27 @@ class MockTest(unittest.TestCase):
                           repr(mock()().foo.bar.baz().bing))
 
 
+    def test_repr_follows_reparenting(self):
+        # __repr__ 有缓存, 但是 parent 链上任意一个mock改名后缓存必须失效.
+        child = Mock().foo.bar
+        self.assertIn("name='mock.foo.bar'", repr(child))
+
+        parent = Mock(name='parent')
+        parent.attach_mock(child._mock_new_parent, 'baz')
+        self.assertIn("name='parent.baz.bar'", repr(child))
+
+        child.mock_add_spec(dict)
+        self.assertIn(" spec='dict' ", repr(child))
+
+
+    def test_repr_of_copy_uses_own_id(self):
+        mock = Mock()
+        repr(mock)
+        copied = copy.copy(mock)
+        self.assertIn(str(id(copied)), repr(copied))
+        self.assertNotEqual(repr(copied), repr(mock))
+
+
     def test_repr_with_spec(self):
         class X(object):
             pass
@@ -410,6 +433,52 @@ class MockTest(unittest.TestCase):
         # used to cause recursion
         mock.reset_mock()
 
+    def test_call_lists_allocated_lazily(self):
+        m = Mock()
+        # 尚未调用过, 只读的断言路径不会分配列表.
+        m.assert_not_called()
+        self.assertIsNone(m.__dict__['_mock_mock_calls'])
+
+        # 调用之前拿到的引用, 在调用之后仍然能看到新的记录.
+        call_args_list = m.call_args_list
+        m(1)
+        self.assertIs(m.call_args_list, call_args_list)
+        self.assertEqual(call_args_list, [call(1)])
+
+        m.reset_mock()
+        self.assertEqual(m.call_args_list, [])
+        self.assertEqual(m.mock_calls, [])
+        self.assertRaises(TypeError, mock._EMPTY_CALLLIST.append, call(1))
+
+        self.assertIsNone(m.__dict__['_mock_method_calls'])
+        m.child(2)
+        self.assertEqual(m.method_calls, [call.child(2)])
+        m.method_calls = []
+        self.assertEqual(m.method_calls, [])
+
+    def test_call_tracking_disabled(self):
+        m = Mock()
+        with mock.patch('unittest.mock._MOCK_TRACK_CALLS', False):
+            m.child(1)
+            m.child(2)
+        self.assertEqual(m.child.call_count, 2)
+        self.assertEqual(m.child.call_args, call(2))
+        self.assertEqual(m.child.call_args_list, [])
+        self.assertEqual(m.mock_calls, [])
+        self.assertEqual(m.method_calls, [])
+
+        m.child(3)
+        self.assertEqual(m.method_calls, [call.child(3)])
+
+        async_mock = mock.AsyncMock()
+        with mock.patch('unittest.mock._MOCK_TRACK_CALLS', False):
+            for i in range(3):
+                asyncio.run(async_mock(i))
+        self.assertEqual(async_mock.await_count, 3)
+        self.assertEqual(async_mock.await_args, call(2))
+        self.assertEqual(async_mock.await_args_list, [])
+        self.assertEqual(async_mock.call_args_list, [])
+
     def test_reset_mock_on_mock_open_issue_18622(self):
         a = mock.mock_open()
         a.reset_mock()
@@ -1159,6 +1228,21 @@ class MockTest(unittest.TestCase):
         self.assertNotIn('child', dir(mock))
 
 
+    def test_dir_sees_attributes_added_to_mock_subclass(self):
+        class MyMock(Mock):
+            pass
+
+        dir(MyMock())
+        MyMock.helper = 1
+        self.assertIn('helper', dir(MyMock()))
+
+
+    def test_setattr_delattr_signatures(self):
+        mock = Mock()
+        self.assertRaises(TypeError, mock.__setattr__, 'foo', 1, 2)
+        self.assertRaises(TypeError, mock.__delattr__, 'foo', 1)
+
+
     def test_configure_mock(self):
         mock = Mock(foo='bar')
         self.assertEqual(mock.foo, 'bar')
@@ -1637,6 +1721,41 @@ class MockTest(unittest.TestCase):
             )
 
 
+    def test_call_matcher_reuses_bound_call(self):
+        def f(a, b): pass
+        def g(b, a): pass
+        m = Mock(spec=f)
+        m(1, 2)
+        kall = m.call_args
+        first = m._recorded_call_matcher(kall)
+        self.assertIs(m._recorded_call_matcher(kall), first)
+
+        other = Mock(spec=g)
+        self.assertEqual(other._recorded_call_matcher(kall), ('', inspect.signature(g).bind(1, 2)))
+        self.assertNotEqual(other._recorded_call_matcher(kall), first)
+
+        expected = call(a=1, b=2)
+        m.assert_has_calls([expected])
+        m.assert_has_calls([expected])
+        m.assert_called_with(a=1, b=2)
+        m.assert_any_call(a=1, b=2)
+        self.assertNotIn('_mock_bound', expected.__dict__)
+
+        m = Mock(spec=lambda: None)
+        m()
+        m.assert_has_calls([call])
+        self.assertNotIn('_mock_bound', call.__dict__)
+
+
+    def test_assert_has_calls_deleted_child_with_spec(self):
+        class Something:
+            def meth(self, a): pass
+        m = create_autospec(Something)
+        m.meth(1)
+        del m.meth
+        m.assert_has_calls([call.meth(1)])
+
+
     def test_assert_has_calls_nested_without_spec(self):
         m = MagicMock()
         m().foo().bar().baz()
@@ -1645,6 +1764,23 @@ class MockTest(unittest.TestCase):
         m.assert_has_calls(calls)
 
 
+    def test_assert_has_calls_spec_attached_later(self):
+        def f(a, b): pass
+        m = Mock()
+        self.assertFalse(m._mock_has_spec_signature)
+        m.child = Mock(spec=f)
+        self.assertTrue(m._mock_has_spec_signature)
+        m.child(1, b=2)
+        m.assert_has_calls([call.child(a=1, b=2)])
+
+        m = MagicMock()
+        m.__call__ = Mock(spec=f)
+        m.other.mock_add_spec(f)
+        self.assertTrue(m._mock_has_spec_signature)
+        m.other(1, 2)
+        m.assert_has_calls([call.other(b=2, a=1)])
+
+
     def test_assert_has_calls_with_function_spec(self):
         def f(a, b, c, d=None): pass
 
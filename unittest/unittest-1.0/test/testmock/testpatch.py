@@ -13,7 +13,7 @@ from test.test_importlib.util import uncache
 from unittest.mock import (
     NonCallableMock, CallableMixin, sentinel,
     MagicMock, Mock, NonCallableMagicMock, patch, _patch,
-    DEFAULT, call, _get_target
+    DEFAULT, call, _get_target, _is_started
 )
 
 
@@ -490,6 +490,23 @@ class PatchTest(unittest.TestCase):
                          "patch not restored")
 
 
+    def test_patch_class_decorator_inherited_methods(self):
+        class Base(object):
+            def test_base(other_self, mock_something):
+                self.assertEqual(PTModule.something, mock_something)
+
+        class Foo(Base):
+            @staticmethod
+            def test_static(mock_something):
+                self.assertEqual(PTModule.something, mock_something)
+
+        Foo = patch('%s.something' % __name__)(Foo)
+        self.assertIn('test_base', Foo.__dict__)
+        Foo().test_base()
+        Foo.test_static()
+        self.assertEqual(PTModule.something, sentinel.Something)
+
+
     def test_patchobject_twice(self):
         class Something(object):
             attribute = sentinel.Original
@@ -566,6 +583,25 @@ class PatchTest(unittest.TestCase):
         self.assertEqual(foo.values, original)
 
 
+    def test_patch_dict_clear_with_popitem_container(self):
+        class PopContainer(Container):
+            def popitem(self):
+                return self.values.popitem()
+
+        foo = PopContainer()
+        foo['initial'] = object()
+        foo['other'] = 'something'
+        original = foo.values.copy()
+
+        @patch.dict(foo, {'a': 'b'}, clear=True)
+        def test():
+            self.assertEqual(foo.values, {'a': 'b'})
+
+        test()
+
+        self.assertEqual(foo.values, original)
+
+
     def test_patch_dict_with_clear(self):
         foo = {'initial': object(), 'other': 'something'}
         original = foo.copy()
@@ -800,6 +836,24 @@ class PatchTest(unittest.TestCase):
         self.assertEqual(d, original)
 
 
+    def test_patch_dict_class_decorator_inherited_methods(self):
+        this = self
+        d = {'spam': 'eggs'}
+        original = d.copy()
+
+        class Base(object):
+            def test_base(self):
+                this.assertEqual(d, {'foo': 'bar'})
+
+        class Test(Base):
+            pass
+
+        Test = patch.dict(d, {'foo': 'bar'}, clear=True)(Test)
+        self.assertIn('test_base', Test.__dict__)
+        Test().test_base()
+        self.assertEqual(d, original)
+
+
     def test_get_only_proxy(self):
         class Something(object):
             foo = 'foo'
@@ -862,6 +916,38 @@ class PatchTest(unittest.TestCase):
         self.assertIsInstance(mock.foo, MagicMock)
 
 
+    def test_patcher_copy_of_started_patcher(self):
+        patcher = patch.multiple(Foo, f=DEFAULT, g=3)
+        patcher.start()
+        try:
+            copied = patcher.copy()
+        finally:
+            patcher.stop()
+
+        self.assertFalse(_is_started(copied))
+        self.assertFalse(hasattr(copied, 'target'))
+        self.assertFalse(hasattr(copied, '__dict__'))
+        self.assertEqual(copied.attribute_name, patcher.attribute_name)
+        self.assertEqual(len(copied.additional_patchers), 1)
+        with copied as values:
+            self.assertIs(Foo.f, values['f'])
+            self.assertEqual(Foo.g, 3)
+        self.assertFalse(isinstance(Foo.f, MagicMock))
+
+
+    def test_patcher_calls_getter_once_per_enter(self):
+        calls = []
+        def getter():
+            calls.append(None)
+            return Foo
+
+        patcher = _patch(getter, 'f', DEFAULT, None, False, None, None,
+                         None, {})
+        with patcher:
+            self.assertIsInstance(Foo.f, MagicMock)
+        self.assertEqual(len(calls), 1)
+
+
     def test_patch_dict_keyword_args(self):
         original = {'foo': 'bar'}
         copy = original.copy()
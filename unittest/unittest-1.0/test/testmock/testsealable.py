@@ -171,6 +171,33 @@ class TestSealable(unittest.TestCase):
             m.test1().test2.test3().test4()
         self.assertIn("mock.test1().test2.test3().test4", str(cm.exception))
 
+    def test_seal_only_visits_existing_children(self):
+        m = mock.MagicMock(spec=SampleObject)
+        m.method_sample1().attr
+        m.__str__.return_value = 'sample'
+
+        mock.seal(m)
+        self.assertEqual(set(m._mock_children), {'method_sample1', '__str__'})
+        with self.assertRaises(AttributeError):
+            m.method_sample2
+        with self.assertRaises(AttributeError):
+            m.method_sample1().other
+        self.assertEqual(str(m), 'sample')
+
+    def test_seal_autospec_attribute_not_yet_accessed(self):
+        class Inner:
+            def f(self): pass
+
+        class Outer:
+            attr = Inner()
+
+        m = mock.create_autospec(Outer)
+        mock.seal(m)
+        with self.assertRaises(AttributeError):
+            m.attr.newthing = 1
+        with self.assertRaises(AttributeError):
+            m.attr.f.newthing = 1
+
 
 if __name__ == "__main__":
     unittest.main()